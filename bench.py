@@ -0,0 +1,75 @@
+"""
+Row hydration benchmark: time spent turning loaded rows into items.
+
+Compares the current loading path (methods bound through class-level itemmethod
+descriptors) with the former per-instance init_on_load, which reflected over the
+class and built closures for every row. Runs against a throwaway database.
+
+    python bench.py [rows] [rounds]
+
+Results are printed and written to bench_output.txt.
+"""
+
+import inspect
+import os
+import sys
+import tempfile
+from asyncio import run
+from time import perf_counter
+
+os.environ["DB_FOLDER_PATH"] = tempfile.mkdtemp() + os.sep
+
+from sqlalchemy import event
+from core.database import *
+
+
+def legacy_init_on_load(self) -> None:
+    """The per-row reconstructor items used to run, kept here for comparison."""
+    self.update = lambda **kwargs: self.__class__.update(
+        id=self.id, **{k: v for k, v in kwargs.items() if k != "id"}
+    )
+    self.delete = lambda: self.__class__.delete(id=self.id)
+    for name, func in inspect.getmembers(self.__class__, inspect.isfunction):
+        if "id" in func.__code__.co_varnames:
+            self.__dict__[name] = lambda **kwargs: func(
+                id=self.id, **{k: v for k, v in kwargs.items() if k != "id"}
+            )
+    if isinstance(self, User):
+        self.get_sessions = lambda: self.__class__.get_sessions(id=self.id)
+        self.create_session = lambda **kwargs: self.__class__.create_session(
+            self, id=self.id, **kwargs
+        )
+
+
+async def load(rows: int, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start_at = perf_counter()
+        items = await User.get_chunk(limit=rows)
+        best = min(best, perf_counter() - start_at)
+    assert len(items) == rows
+    return best
+
+
+async def main(rows: int = 500, rounds: int = 20) -> None:
+    await create_tables()
+    await User.add_many(
+        {"username": f"bench_{x}", "email": f"bench_{x}@example.com", "password": "-"}
+        for x in range(rows)
+    )
+    current = await load(rows, rounds)
+    event.listen(User, "load", lambda item, context: legacy_init_on_load(item))
+    legacy = await load(rows, rounds)
+
+    report = (
+        f"Loading {rows} users, best of {rounds}:\n"
+        f"  - init_on_load lambdas: {legacy * 1000:.2f}ms ({legacy / rows * 1e6:.2f}us/row)\n"
+        f"  - itemmethod descriptors: {current * 1000:.2f}ms ({current / rows * 1e6:.2f}us/row)\n"
+        f"  - speedup: {legacy / current:.2f}x"
+    )
+    print(report)
+    with open("bench_output.txt", "w") as f:
+        f.write(report + "\n")
+
+
+run(main(*[int(arg) for arg in sys.argv[1:3]]))
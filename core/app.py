@@ -4,7 +4,16 @@ from slowapi.errors import RateLimitExceeded
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from datetime import datetime
-from core import Translator, Checks, setup_hook, Email
+from core import (
+    Translator,
+    Checks,
+    setup_hook,
+    Email,
+    Credentials,
+    http_clients,
+    ExpiringMap,
+    RateLimiter,
+)
 from loguru import logger
 from pprint import pformat
 from loguru._defaults import LOGURU_FORMAT
@@ -94,6 +103,11 @@ app.api_url = getenv("BACKEND_URL", "")
 app.root = "/"
 app.translator = Translator()
 app.email = Email(getenv("EMAIL_FROM", "mail@" + app.url.split("//")[1]), app)
+app.credentials = Credentials()
+app.router.on_shutdown.append(app.credentials.shutdown)
+app.router.on_shutdown.append(app.email.shutdown)
+app.http = http_clients
+app.router.on_shutdown.append(app.http.close)
 app.logger = logger
 app.info = app.logger.info
 app.error = app.logger.error
@@ -106,8 +120,20 @@ app.tl = app.translator.tl
 app.tlbook = app.translator.tlbook
 app.title = app.tl("title")
 app.description = app.tl("description")
-app.ipratelimit = {}
-app.turnstile_buf = {}
+app.ipratelimit = RateLimiter(
+    {
+        "period": (
+            int(getenv("IP_RATE_LIMIT_PER_PERIOD", 60)),
+            int(getenv("IP_RATE_LIMIT_PERIOD_SECONDS", 60)),
+        ),
+        "second": (int(getenv("IP_RATE_LIMIT_PER_SECOND", 3)), 1),
+    },
+    capacity=int(getenv("IP_STATE_CAPACITY", 100_000)),
+)
+app.turnstile_buf = ExpiringMap(
+    capacity=int(getenv("IP_STATE_CAPACITY", 100_000)),
+    ttl=int(getenv("TURNSTILE_ACCESS_BUF", 60 * 60)),
+)
 
 Thread(target=run, args=(rechache_translations(),)).start()
 
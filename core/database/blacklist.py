@@ -0,0 +1,178 @@
+import os
+import unicodedata
+from asyncio import sleep
+from collections import deque
+from loguru import logger
+from typing import Dict, Iterable, List
+
+HOMOGLYPHS = str.maketrans(
+    {
+        "0": "o",
+        "1": "i",  # 1, l, | and ! all read as i
+        "l": "i",
+        "!": "i",
+        "|": "i",
+        "3": "e",
+        "4": "a",
+        "@": "a",
+        "5": "s",
+        "$": "s",
+        "7": "t",
+        "а": "a",  # cyrillic
+        "в": "b",
+        "е": "e",
+        "к": "k",
+        "м": "m",
+        "н": "h",
+        "о": "o",
+        "р": "p",
+        "с": "c",
+        "т": "t",
+        "у": "y",
+        "х": "x",
+        "і": "i",
+        "ј": "j",
+        "ѕ": "s",
+        "ο": "o",  # greek
+        "α": "a",
+        "ε": "e",
+        "ι": "i",
+        "κ": "k",
+        "ν": "v",
+        "ρ": "p",
+        "τ": "t",
+        "υ": "u",
+        "χ": "x",
+    }
+)
+
+
+def normalize(value: str) -> str:
+    """
+    Folds case, compatibility forms, accents and common homoglyphs, and drops
+    separators, so "Аdm1n", "ａｄｍｉｎ" and "a.d.m.i.n" all become "admin".
+    """
+    value = unicodedata.normalize("NFKD", str(value).casefold())
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    return "".join(char for char in value.translate(HOMOGLYPHS) if char.isalnum())
+
+
+class Automaton:
+    """
+    Aho-Corasick automaton: finds whether any of the patterns occurs in a string
+    in a single O(len(string)) pass.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[bool] = [False]
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._link()
+
+    def _add(self, pattern: str) -> None:
+        state = 0
+        for char in pattern:
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(False)
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        self.output[state] = True
+
+    def _link(self) -> None:
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                if self.fail[child] == child:
+                    self.fail[child] = 0
+                self.output[child] = self.output[child] or self.output[self.fail[child]]
+
+    def search(self, text: str) -> bool:
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                return True
+        return False
+
+
+class BlacklistIndex:
+    """
+    In-memory index of the blacklists/<key>.txt files.
+
+    Every file is compiled into a set for exact matches, and for the keys listed in
+    BLACKLIST_NORMALIZED_KEYS into an automaton matching normalized substrings too.
+    watch() reloads the files when their mtime changes, swapping the whole index at once.
+    """
+
+    def __init__(self, folder: str, normalized_keys: Iterable[str] = ()):
+        self.folder = folder
+        self.normalized_keys = frozenset(normalized_keys)
+        self.exact: Dict[str, frozenset] = {}
+        self.automata: Dict[str, Automaton] = {}
+        self.mtimes: Dict[str, float] = {}
+        self.load()
+
+    def _scan(self) -> Dict[str, float]:
+        if not os.path.isdir(self.folder):
+            return {}
+        return {
+            entry.name: entry.stat().st_mtime
+            for entry in os.scandir(self.folder)
+            if entry.name.endswith(".txt")
+        }
+
+    def load(self) -> None:
+        mtimes = self._scan()
+        exact, automata = {}, {}
+        for filename in mtimes:
+            key = filename[: -len(".txt")]
+            with open(os.path.join(self.folder, filename)) as f:
+                lines = [line.strip() for line in f]
+            exact[key] = frozenset(lines)
+            if key in self.normalized_keys:
+                automata[key] = Automaton({normalize(line) for line in lines})
+        self.exact, self.automata, self.mtimes = exact, automata, mtimes
+
+    def reload_if_changed(self) -> bool:
+        if self._scan() == self.mtimes:
+            return False
+        self.load()
+        logger.info(f"Reloaded blacklists ({', '.join(sorted(self.exact))})")
+        return True
+
+    def is_blacklisted(self, key: str, value) -> bool:
+        values = self.exact.get(key)
+        if values is None:
+            return False
+        if str(value) in values:
+            return True
+        automaton = self.automata.get(key)
+        return automaton is not None and automaton.search(normalize(value))
+
+    async def watch(self, interval: float = 30) -> None:
+        while True:
+            await sleep(interval)
+            try:
+                self.reload_if_changed()
+            except Exception as exc:
+                logger.error(f"Error while reloading blacklists: {exc}")
+
+
+blacklists = BlacklistIndex(
+    os.path.join(os.path.dirname(__file__), "blacklists"),
+    [key for key in os.getenv("BLACKLIST_NORMALIZED_KEYS", "").split(",") if key],
+)
@@ -0,0 +1,65 @@
+from hashlib import blake2b
+from math import ceil, exp, log
+from typing import Any, Dict
+
+
+class BloomFilter:
+    """
+    Set membership with no false negatives and a bounded false-positive rate.
+
+    Sized for `capacity` values at `error_rate`; positions come from two 64-bit
+    halves of one blake2b digest (Kirsch-Mitzenmacher double hashing). Values can't
+    be removed, a stale value only costs a fallback query.
+    """
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.size = ceil(-self.capacity * log(error_rate) / log(2) ** 2)
+        self.hashes = max(round(self.size / self.capacity * log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self.checks = 0
+        self.negatives = 0
+        self.false_positives = 0
+
+    def _positions(self, value: Any):
+        digest = blake2b(str(value).encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, value: Any) -> None:
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value: Any) -> bool:
+        self.checks += 1
+        for position in self._positions(value):
+            if not self.bits[position >> 3] & (1 << (position & 7)):
+                self.negatives += 1
+                return False
+        return True
+
+    def false_positive_rate(self) -> float:
+        """
+        Expected false-positive rate at the current number of values.
+        """
+        return (1 - exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+    def stats(self) -> Dict[str, Any]:
+        positives = self.checks - self.negatives
+        return {
+            "count": self.count,
+            "capacity": self.capacity,
+            "hashes": self.hashes,
+            "memory_bytes": len(self.bits),
+            "false_positive_rate": round(self.false_positive_rate(), 9),
+            "observed_false_positive_rate": (
+                round(self.false_positives / positives, 7) if positives else 0.0
+            ),
+            "checks": self.checks,
+            "skipped_queries": self.negatives,
+        }
@@ -0,0 +1,209 @@
+import sys
+from copy import deepcopy
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Dict, Hashable, Iterable, Set
+
+
+class LRUCache:
+    """
+    Bounded in-process cache with LRU eviction and a TTL per entry.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[Hashable, tuple] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at < monotonic():
+            self.pop(key)
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self.pop(next(iter(self._data)))
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 5) if total else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+
+def copy_row(row: dict) -> dict:
+    """
+    Copies a row snapshot deep enough that its JSON values aren't shared.
+    """
+    return {
+        key: deepcopy(value) if isinstance(value, (dict, list)) else value
+        for key, value in row.items()
+    }
+
+
+class TokenCache(LRUCache):
+    """
+    Token -> user row snapshot cache used by Session.get_user.
+
+    Keeps a reverse index user_id -> tokens so a User write can drop every
+    token that resolves to that user. Like RowCache, invalidations bump a
+    generation counter so a lookup that started before one can't store its result.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 60.0):
+        super().__init__(maxsize, ttl)
+        self.generation = 0
+        self._tokens: Dict[int, Set[str]] = {}
+
+    def store(self, token: str, row: dict, generation: int) -> None:
+        if generation != self.generation:
+            return
+        self.set(token, copy_row(row))
+
+    def set(self, token: str, row: dict) -> None:
+        self.pop(token)
+        self._tokens.setdefault(row["id"], set()).add(token)
+        super().set(token, row)
+
+    def pop(self, token: str, default: Any = None) -> Any:
+        row = super().pop(token, None)
+        if row is None:
+            return default
+        tokens = self._tokens.get(row["id"])
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens[row["id"]]
+        return row
+
+    def invalidate(self, token: str) -> None:
+        self.generation += 1
+        self.pop(token)
+
+    def invalidate_user(self, user_id: int) -> None:
+        self.generation += 1
+        for token in list(self._tokens.get(user_id, ())):
+            self.pop(token)
+
+    def clear(self) -> None:
+        super().clear()
+        self._tokens.clear()
+
+
+class RowCache(LRUCache):
+    """
+    Read-through cache of row snapshots for BaseItem.get.
+
+    Rows are stored once under ("id", id); unique columns get ("column", value)
+    aliases pointing at the id, checked against the row on every hit. Besides the
+    entry count it is bounded by an approximate memory budget.
+
+    invalidate() bumps a generation counter: a row read before an invalidation
+    is not stored, so a slow reader can't put back a stale snapshot.
+    """
+
+    def __init__(
+        self,
+        columns: Iterable[str],
+        maxsize: int = 10_000,
+        ttl: float = 300.0,
+        max_bytes: int = 32 * 1024 * 1024,
+    ):
+        super().__init__(maxsize, ttl)
+        self.columns = frozenset(columns)
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.generation = 0
+        self._sizes: Dict[Hashable, int] = {}
+
+    @staticmethod
+    def _sizeof(value: Any) -> int:
+        if isinstance(value, dict):
+            return sys.getsizeof(value) + sum(
+                sys.getsizeof(item) for item in value.values()
+            )
+        return sys.getsizeof(value)
+
+    def lookup(self, column: str, value: Any) -> dict | None:
+        if column == "id":
+            return self.get(("id", value))
+        id = self.get((column, value))
+        if id is None:
+            return None
+        self.hits -= 1  # a lookup counts once, by the row
+        row = self.get(("id", id))
+        if row is None or row.get(column) != value:
+            self.pop((column, value))
+            return None
+        return row
+
+    def store(self, row: dict, generation: int) -> None:
+        if generation != self.generation:
+            return
+        # the instance the row came from goes back to the caller, don't share its
+        # JSON values with the cache
+        row = copy_row(row)
+        self.set(("id", row["id"]), row)
+        for column in self.columns - {"id"}:
+            if row.get(column) is not None:
+                self.set((column, row[column]), row["id"])
+
+    def invalidate(self, id: int) -> None:
+        self.generation += 1
+        self.pop(("id", id))
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self.pop(key)
+        size = self._sizeof(key) + self._sizeof(value)
+        self._sizes[key] = size
+        self.bytes += size
+        super().set(key, value)
+        while self.bytes > self.max_bytes and self._data:
+            self.pop(next(iter(self._data)))
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        self.bytes -= self._sizes.pop(key, 0)
+        return super().pop(key, default)
+
+    def clear(self) -> None:
+        super().clear()
+        self._sizes.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "bytes": self.bytes, "max_bytes": self.max_bytes}
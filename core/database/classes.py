@@ -9,81 +9,178 @@ from sqlalchemy import (
     func,
     Identity,
     ForeignKey,
+    delete,
+    tuple_,
+    Index,
+    Table,
+    update as sql_update,
+    and_,
+    or_,
 )
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, reconstructor
+from sqlalchemy.orm import sessionmaker, make_transient_to_detached
 from sqlalchemy.future import select
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncConnection
 from datetime import datetime
-from typing import Self, List, Literal, Dict
+from typing import (
+    Self,
+    List,
+    Literal,
+    Dict,
+    Iterable,
+    AsyncIterable,
+    AsyncIterator,
+    Sequence,
+    Tuple,
+    AsyncContextManager,
+)
 from cryptography.fernet import Fernet
 from os import getenv
 from dotenv import load_dotenv
-from time import sleep
 from loguru import logger
 from string import ascii_letters, digits
 from random import choice
-import inspect
-from asyncio import get_event_loop, new_event_loop
+from functools import update_wrapper
+from types import MethodType
+import json
+from copy import deepcopy
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+import numpy as np
+from asyncio import get_event_loop, new_event_loop, sleep as async_sleep
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 import core.database.exceptions as database_exc
+from .cache import TokenCache, RowCache
+from .search import FullTextIndex
+from . import ranking
+from .engine import create_writer, create_reader, routes
+from .crypto import ciphers, Hashed, hash_password, verify_password
+from .blacklist import blacklists
+from .metrics import PerfomanceMeter
+from .statements import profiler
+from .bloom import BloomFilter
+from .rows import Row, make_row_class
 
 
 load_dotenv()
+databases = ["main"] + sorted(set(routes.values()) - {"main"})
 engines = {
-    n: create_async_engine(
-        "sqlite+aiosqlite:///"
-        + getenv("DB_FOLDER_PATH")
-        + (f"{n}_" if n != "main" else "")
-        + "server.sqlite"
-    )
-    for n in ["main"]
+    n: create_writer(n, attach=[d for d in databases if d != n]) for n in databases
+}
+readers = {
+    n: create_reader(n, attach=[d for d in databases if d != n]) for n in databases
 }
 sessions = {
     k: sessionmaker(v, expire_on_commit=False, class_=AsyncSession)
     for k, v in engines.items()
 }
-Base = declarative_base()
+read_sessions = {
+    k: sessionmaker(v, expire_on_commit=False, class_=AsyncSession)
+    for k, v in readers.items()
+}
 
 
-class PerfomanceMeter:
-    start = datetime.now()
-    all = [0]
+class UnitOfWork(AsyncSession):
+    """
+    Session shared by every operation inside a BaseItem.transaction(): their
+    commit() only flushes, the whole unit commits once when the block exits.
+    """
 
-    async def report(self):
-        while True:
-            await sleep(60 * 5)
-            if len(self.all) > 10**6:
-                self.all = self.all[-(10**6) :]
-            avg_all = sum(self.all) / len(self.all)
-            avg_1k = sum(self.all[-1000:]) / len(self.all[-1000:])
-            avg_100 = sum(self.all[-100:]) / len(self.all[-100:])
-            logger.info(
-                f"Database delay report:\n"
-                f"  - Average time per action: {avg_all / 1000:.2f}ms\n"
-                f"  - Average time per action (last 1k): {avg_1k / 1000:.2f}ms\n"
-                f"  - Average time per action (last 100): {avg_100 / 1000:.2f}ms"
-            )
+    async def commit(self) -> None:
+        await self.flush()
+
+    async def finish(self) -> None:
+        await super().commit()
+
+
+unit_sessions = {
+    k: sessionmaker(v, expire_on_commit=False, class_=UnitOfWork)
+    for k, v in engines.items()
+}
+unit_of_work: ContextVar[Dict[str, UnitOfWork] | None] = ContextVar(
+    "unit_of_work", default=None
+)
+for n in databases:
+    profiler.attach(engines[n], n)
+    profiler.attach(readers[n], n)
+Base = declarative_base()
 
 
-perfomance = PerfomanceMeter()
+perfomance = PerfomanceMeter(int(getenv("PERFOMANCE_BUFFER_SIZE", 100_000)))
+audit_compact_interval = int(getenv("AUDIT_COMPACT_INTERVAL", 0))
+token_cache = TokenCache(
+    maxsize=int(getenv("TOKEN_CACHE_SIZE", 10_000)),
+    ttl=float(getenv("TOKEN_CACHE_TTL", 60)),
+)
+row_caches: Dict[str, RowCache] = {}
+row_classes: Dict[tuple, type] = {}
+bloom_capacity = int(getenv("BLOOM_CAPACITY", 100_000))
+bloom_error_rate = float(getenv("BLOOM_ERROR_RATE", 0.001))
+
+def database_of(table) -> str:
+    """
+    Returns the name of the database a table lives in: its DB_ROUTES entry if any,
+    the `comment` of its __table_args__ otherwise.
+    """
+    return routes.get(table.name, table.comment or "main")
+
 
 def db_debug(*args, **kwargs):
     if os.getenv("DB_DEBUG", False):
         logger.debug(*args, **kwargs)
 
 
+class itemmethod:
+    """
+    A classmethod that, accessed on an item, is bound to that row: `id` is fixed
+    to the item's id (unless `bind_id` is False) and `defaults` fill the keyword
+    arguments the caller didn't pass.
+
+    Lives on the class, so loading rows doesn't create anything per instance.
+
+    Usage:
+        await User.update(id=1, name="...")
+        await user.update(name="...")
+    """
+
+    def __init__(self, func=None, bind_id: bool = True, **defaults):
+        self.bind_id = bind_id
+        self.defaults = defaults
+        if func is not None:
+            self(func)
+
+    def __call__(self, func) -> "itemmethod":
+        self.__func__ = func
+        update_wrapper(self, func)
+        return self
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return MethodType(self.__func__, owner)
+        func, cls, defaults = self.__func__, type(instance), self.defaults
+        if not self.bind_id:
+            return lambda **kwargs: func(cls, **{**defaults, **kwargs})
+        id = instance.id
+        return lambda **kwargs: func(
+            cls,
+            id=id,
+            **{**defaults, **{k: v for k, v in kwargs.items() if k != "id"}},
+        )
+
+
 class BaseItem(Base):
     """
     Base class for all database items
     """
 
     __abstract__ = True
-
-    class Audit:
-        def __repr__(self):
-            return f'<Audit audits={sum([len(x) for x in self.__dict__.values()])} [{", ".join([str(x) for x in self.__dict__.keys() if len(self.__dict__[x]) > 0])}]>'
-
-    audit = Audit()
+    __fts__ = False
+    __hot_filters__ = (("id",),)
+    __bloom__: Tuple[str, ...] = ()
+    __row_cache__ = False
+    _bloom_filters: Dict[str, BloomFilter] = {}
+    _bloom_building: Dict[str, BloomFilter] | None = None
 
     id = Column(
         Integer,
@@ -100,17 +197,83 @@ class BaseItem(Base):
     )
     is_deleted = Column(Boolean)
 
-    @reconstructor
-    def init_on_load(self) -> None:
-        self.update = lambda **kwargs: self.__class__.update(
-            id=self.id, **{k: v for k, v in kwargs.items() if k != "id"}
-        )
-        self.delete = lambda: self.__class__.delete(id=self.id)
-        for name, func in inspect.getmembers(self.__class__, inspect.isfunction):
-            if "id" in func.__code__.co_varnames:
-                self.__dict__[name] = lambda **kwargs: func(
-                    id=self.id, **{k: v for k, v in kwargs.items() if k != "id"}
-                )
+    @classmethod
+    def _database(cls) -> str:
+        return database_of(cls.__table__)
+
+    @classmethod
+    def _session(cls, write: bool = True) -> AsyncContextManager[AsyncSession]:
+        """
+        Opens a transaction on the model's database: on the single writer connection,
+        or on the read-only pool when `write` is False.
+
+        Inside a transaction() block the unit's session of that database is joined
+        instead, reads included, so they see the unit's uncommitted writes.
+        """
+        unit = unit_of_work.get()
+        if unit is None:
+            return (sessions if write else read_sessions)[cls._database()].begin()
+        database = cls._database()
+        if database not in unit:
+            unit[database] = unit_sessions[database]()
+        return cls._join(unit[database])
+
+    @staticmethod
+    @asynccontextmanager
+    async def _join(session: UnitOfWork) -> AsyncIterator[UnitOfWork]:
+        yield session
+
+    @classmethod
+    @asynccontextmanager
+    async def transaction(cls) -> AsyncIterator[Dict[str, AsyncSession]]:
+        """
+        Runs every operation of the block in one transaction per database, committed
+        once on exit and rolled back if the block raises. Nested blocks join the outer one.
+
+        Usage:
+            async with BaseItem.transaction():
+                user = await User.add(username="...")
+                await user.create_session()
+
+        Holds the writer connection of each database it touched until the block exits,
+        so keep slow work (hashing, network calls) out of it.
+
+        Yields:
+            The unit's sessions by database name
+        """
+        unit = unit_of_work.get()
+        if unit is not None:
+            yield unit
+            return
+        unit = {}
+        token = unit_of_work.set(unit)
+        start_at = datetime.now()
+        committed = False
+        try:
+            yield unit
+            for session in unit.values():
+                await session.finish()
+            committed = True
+        except BaseException:
+            for session in unit.values():
+                await session.rollback()
+            raise
+        finally:
+            unit_of_work.reset(token)
+            try:
+                # nothing reached the database on rollback, so nothing to drop
+                if committed:
+                    for session in unit.values():
+                        for item_cls, keys in session.info.get("invalidate", ()):
+                            item_cls._drop_caches(keys)
+            finally:
+                for session in unit.values():
+                    await session.close()
+            perfomance.record(
+                "transaction",
+                getattr(cls, "__tablename__", cls.__name__),
+                (datetime.now() - start_at).total_seconds(),
+            )
 
     @classmethod
     async def add(
@@ -126,23 +289,122 @@ class BaseItem(Base):
             The newly created item
         """
         start_at = datetime.now()
-        async with sessions[
-            cls.__table_args__.get("comment", "main")
-        ].begin() as session:
-            for key, value in kwargs.items():
-                if not ignore_blacklist and cls._is_value_blacklisted(key, value):
-                    raise database_exc.Blacklisted(key, value)
-                if key in getenv("CRYPT_VALUES", "").split(",") and not ignore_crypt:
-                    kwargs[key] = cls._crypt(value)
+        async with cls._session() as session:
+            kwargs = cls._prepare_row(kwargs, ignore_crypt, ignore_blacklist)
             item = cls(**kwargs)
             for key, value in kwargs.items():
                 setattr(item, key, value)
             session.add(item)
             await session.commit()
-        perfomance.all += [(datetime.now() - start_at).total_seconds()]
+        cls._bloom_add([kwargs])
+        perfomance.record(
+            "add", cls.__tablename__, (datetime.now() - start_at).total_seconds()
+        )
         db_debug(f"ADD {item}")
         return item
 
+    @classmethod
+    async def add_many(
+        cls,
+        rows: Iterable[dict] | AsyncIterable[dict],
+        chunk_size: int = 1000,
+        ignore_crypt: bool = False,
+        ignore_blacklist: bool = True,
+    ) -> List[int]:
+        """
+        Adds many items to the database using executemany-style inserts.
+
+        Rows are written in chunks, one transaction per chunk, with the same
+        encryption and blacklist rules as add().
+
+        Args:
+            rows (Iterable[dict] | AsyncIterable[dict]): the column values of each item
+            chunk_size (int, optional): rows per transaction. Defaults to 1000.
+            ignore_crypt (bool, optional): Whether to ignore encryption. Defaults to False.
+            ignore_blacklist (bool, optional): Whether to ignore blacklisting. Defaults to True.
+
+        Returns:
+            The ids of the inserted items, in input order
+        """
+        ids = []
+        async for chunk in cls._chunked(rows, chunk_size):
+            start_at = datetime.now()
+            chunk = cls._prepare_rows(chunk, ignore_crypt, ignore_blacklist)
+            async with cls._session() as session:
+                result = await session.execute(
+                    insert(cls).returning(cls.id, sort_by_parameter_order=True),
+                    chunk,
+                )
+                ids.extend(result.scalars().all())
+                await session.commit()
+            cls._bloom_add(chunk)
+            perfomance.record(
+                "add", cls.__tablename__, (datetime.now() - start_at).total_seconds()
+            )
+        db_debug(f"ADD MANY {cls.__name__} x{len(ids)}")
+        return ids
+
+    @classmethod
+    async def upsert_many(
+        cls,
+        rows: Iterable[dict] | AsyncIterable[dict],
+        conflict_on: Sequence[str] = ("id",),
+        chunk_size: int = 1000,
+        ignore_crypt: bool = False,
+        ignore_blacklist: bool = True,
+    ) -> List[int]:
+        """
+        Inserts many items, updating the existing ones that conflict on `conflict_on`.
+
+        Every row is a full INSERT first: SQLite checks NOT NULL constraints before
+        ON CONFLICT applies, so rows must carry all required columns even when they
+        are meant to update an existing item. On conflict only the columns present
+        in the row are overwritten, the others keep their stored values. Updates
+        made this way are not written to the audit log.
+
+        Args:
+            rows (Iterable[dict] | AsyncIterable[dict]): the column values of each item
+            conflict_on (Sequence[str], optional): unique columns to match existing items on. Defaults to ("id",).
+            chunk_size (int, optional): rows per transaction. Defaults to 1000.
+            ignore_crypt (bool, optional): Whether to ignore encryption. Defaults to False.
+            ignore_blacklist (bool, optional): Whether to ignore blacklisting. Defaults to True.
+
+        Returns:
+            The ids of the inserted or updated items
+        """
+        ids = []
+        async for chunk in cls._chunked(rows, chunk_size):
+            start_at = datetime.now()
+            groups = {}
+            for row in cls._prepare_rows(chunk, ignore_crypt, ignore_blacklist):
+                groups.setdefault(tuple(sorted(row)), []).append(row)
+            upserted = []
+            async with cls._session() as session:
+                for keys, group in groups.items():
+                    stmt = insert(cls)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=list(conflict_on),
+                        set_={
+                            **{
+                                key: stmt.excluded[key]
+                                for key in keys
+                                if key not in conflict_on
+                            },
+                            "updated_at": func.now(),
+                        },
+                    ).returning(cls)
+                    upserted.extend((await session.execute(stmt, group)).scalars().all())
+                    cls._bloom_add(group)
+                await session.commit()
+            for item in upserted:
+                item._invalidate_caches()
+                ids.append(item.id)
+            perfomance.record(
+                "add", cls.__tablename__, (datetime.now() - start_at).total_seconds()
+            )
+        db_debug(f"UPSERT MANY {cls.__name__} x{len(ids)}")
+        return ids
+
     @classmethod
     async def get(cls, **filters) -> Self | None:
         """
@@ -155,18 +417,125 @@ class BaseItem(Base):
             The item if found, None otherwise
         """
         start_at = datetime.now()
-        async with sessions[
-            cls.__table_args__.get("comment", "main")
-        ].begin() as session:
+        cache = cls._row_cache() if len(filters) == 1 else None
+        if cache is not None:
+            ((column, value),) = filters.items()
+            if column not in cache.columns:
+                cache = None
+            else:
+                row = cache.lookup(column, value)
+                if row is not None:
+                    perfomance.record(
+                        "cached_get",
+                        cls.__tablename__,
+                        (datetime.now() - start_at).total_seconds(),
+                    )
+                    return cls._from_snapshot(row)
+                generation = cache.generation
+        async with cls._session(write=False) as session:
             item = (
                 (await session.execute(select(cls).filter_by(**filters)))
                 .scalars()
                 .first()
             )
-        perfomance.all += [(datetime.now() - start_at).total_seconds()]
+        if cache is not None and item is not None:
+            cache.store(item._snapshot(), generation)
+        perfomance.record(
+            "get", cls.__tablename__, (datetime.now() - start_at).total_seconds()
+        )
         db_debug(f"GET {item}")
         return item
 
+    @classmethod
+    async def is_taken(cls, column: str, value) -> bool:
+        """
+        Checks whether any item has `value` in `column`.
+
+        For __bloom__ columns a negative answer comes from the in-memory filter
+        without a query; only possible hits are confirmed in the database.
+
+        Args:
+            column (str): the column to check
+            value: the value to look for
+
+        Returns:
+            True if an item has the value, False otherwise
+        """
+        bloom = cls._bloom_filters.get(column)
+        if bloom is not None and value not in bloom:
+            return False
+        start_at = datetime.now()
+        async with cls._session(write=False) as session:
+            taken = (
+                await session.execute(
+                    select(cls.id).filter_by(**{column: value}).limit(1)
+                )
+            ).first() is not None
+        perfomance.record(
+            "get", cls.__tablename__, (datetime.now() - start_at).total_seconds()
+        )
+        if bloom is not None and not taken:
+            bloom.false_positives += 1
+        return taken
+
+    @classmethod
+    async def select_columns(
+        cls,
+        *columns: str,
+        limit: int = -1,
+        offset: int = 0,
+        order_by: str = "id",
+        **filters,
+    ) -> List[Row]:
+        """
+        Gets only the given columns of the matching items, as compact read-only rows.
+
+        Rows skip ORM hydration and the identity map; CRYPT_VALUES columns are
+        decrypted on first access (row.raw(column) returns the stored value).
+
+        Args:
+            *columns (str): the columns to select, all of them if none are given
+            limit (int, optional): the maximum number of rows to return. Defaults to -1 (all).
+            offset (int, optional): the offset to start from. Defaults to 0.
+            order_by (str, optional): the column to order by. Defaults to "id".
+            **filters: the keyword arguments to filter by
+
+        Returns:
+            A list of rows with the columns as attributes
+        """
+        start_at = datetime.now()
+        columns = columns or tuple(cls.__table__.columns.keys())
+        unknown = [
+            column for column in (*columns, order_by) if column not in cls.__table__.c
+        ]
+        if unknown:
+            raise database_exc.Invalid(f"Unknown columns {', '.join(unknown)}")
+        row_class = cls._row_class(columns)
+        async with cls._session(write=False) as session:
+            result = await session.execute(
+                select(*[cls.__table__.c[column] for column in columns])
+                .filter_by(**filters)
+                .order_by(cls.__table__.c[order_by])
+                .limit(limit)
+                .offset(offset)
+            )
+            rows = [row_class(values) for values in result.tuples()]
+        perfomance.record(
+            "get", cls.__tablename__, (datetime.now() - start_at).total_seconds()
+        )
+        db_debug(f"SELECT COLUMNS {cls.__name__} x{len(rows)}")
+        return rows
+
+    @classmethod
+    def _row_class(cls, columns: Tuple[str, ...]) -> type:
+        key = (cls.__tablename__, columns, ciphers.crypt_values)
+        row_class = row_classes.get(key)
+        if row_class is None:
+            row_class = row_classes[key] = make_row_class(
+                f"{cls.__name__}Row", columns, ciphers.crypt_values
+            )
+        return row_class
+
     @classmethod
     async def get_chunk(
         cls, limit: int = 100, offset: int = 0, **filters
@@ -183,9 +552,7 @@ class BaseItem(Base):
             A list of items
         """
         start_at = datetime.now()
-        async with sessions[
-            cls.__table_args__.get("comment", "main")
-        ].begin() as session:
+        async with cls._session(write=False) as session:
             items = (
                 (
                     await session.execute(
@@ -195,24 +562,138 @@ class BaseItem(Base):
                 .scalars()
                 .all()
             )
-        perfomance.all += [(datetime.now() - start_at).total_seconds()]
+        perfomance.record(
+            "get", cls.__tablename__, (datetime.now() - start_at).total_seconds()
+        )
         db_debug(f"GET CHUNK {items}")
         return items
 
     @classmethod
-    async def get_all(cls, **filters) -> List[Self]:
+    async def get_page(
+        cls,
+        limit: int = 100,
+        cursor: str = None,
+        order_by: str = "id",
+        desc: bool = False,
+        **filters,
+    ) -> Tuple[List[Self], str | None]:
+        """
+        Gets a page of items using keyset (cursor) pagination.
+
+        Unlike get_chunk's OFFSET, every page is a single index range scan, so deep
+        pages cost the same as the first one and don't shift when rows are inserted.
+
+        Args:
+            limit (int, optional): the maximum number of items to return. Defaults to 100.
+            cursor (str, optional): the continuation token of the previous page. Defaults to None.
+            order_by (str, optional): an indexed column to order by, ties are broken by id. Defaults to "id".
+            desc (bool, optional): Whether to return items in descending order. Defaults to False.
+            **filters: the keyword arguments to filter by
+
+        Returns:
+            A list of items and the continuation token of the next page (None on the last page)
+        """
+        start_at = datetime.now()
+        column = getattr(cls, order_by, None)
+        if column is None or not (
+            column.primary_key or column.unique or column.index
+        ):
+            raise database_exc.Invalid(f"Can't paginate by non-indexed column {order_by}")
+        keys = (column,) if order_by == "id" else (column, cls.id)
+        stmt = select(cls).filter_by(**filters)
+        if cursor:
+            stmt = stmt.where(
+                cls._after_clause(keys, cls._decode_cursor(cursor, keys), desc)
+            )
+        stmt = stmt.order_by(*[key.desc() if desc else key for key in keys])
+        async with cls._session(write=False) as session:
+            items = (
+                (await session.execute(stmt.limit(limit + 1))).scalars().all()
+            )
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = cls._encode_cursor(
+                [getattr(items[-1], key.key) for key in keys]
+            )
+        perfomance.record(
+            "get", cls.__tablename__, (datetime.now() - start_at).total_seconds()
+        )
+        db_debug(f"GET PAGE {items}")
+        return items, next_cursor
+
+    @classmethod
+    async def get_all(cls, batch_size: int = None, **filters) -> List[Self]:
         """
         Gets all items from the database.
 
         Args:
+            batch_size (int, optional): if set, items are read in keyset pages of this size
+                instead of one query, so no read transaction stays open for the whole table.
             **filters: the keyword arguments to filter by
 
         Returns:
             A list of all items
         """
-        return await cls.get_chunk(limit=-1, **filters)
+        if not batch_size:
+            return await cls.get_chunk(limit=-1, **filters)
+        items, cursor = await cls.get_page(limit=batch_size, **filters)
+        while cursor:
+            page, cursor = await cls.get_page(limit=batch_size, cursor=cursor, **filters)
+            items.extend(page)
+        return items
 
     @classmethod
+    async def iter_all(
+        cls, batch_size: int = 1000, **filters
+    ) -> AsyncIterator[Self]:
+        """
+        Iterates over all items matching the filters without loading them all.
+
+        Rows are streamed from a server-side cursor `batch_size` at a time, so memory
+        stays flat regardless of table size.
+
+        The cursor and its read session are released when the loop runs to the end.
+        A `break` only suspends the generator and leaves them open until it is
+        garbage collected, so to stop early wrap it in `contextlib.aclosing()`
+        (or call `aclose()` on it).
+
+        Usage:
+            async with aclosing(User.iter_all()) as users:
+                async for user in users:
+                    if ...:
+                        break
+
+        Args:
+            batch_size (int, optional): the number of rows fetched per round trip. Defaults to 1000.
+            **filters: the keyword arguments to filter by
+
+        Yields:
+            The items, ordered by id
+        """
+        start_at = datetime.now()
+        count = 0
+        async with cls._session(write=False) as session:
+            result = await session.stream_scalars(
+                select(cls)
+                .filter_by(**filters)
+                .order_by(cls.id)
+                .execution_options(yield_per=batch_size)
+            )
+            try:
+                async for item in result:
+                    count += 1
+                    yield item
+            finally:
+                await result.close()
+                perfomance.record(
+                    "get",
+                    cls.__tablename__,
+                    (datetime.now() - start_at).total_seconds(),
+                )
+                db_debug(f"ITER ALL {cls.__name__} x{count}")
+
+    @itemmethod
     async def update(
         cls,
         id: int = None,
@@ -237,34 +718,50 @@ class BaseItem(Base):
             id = cls.id
         if not id:
             raise database_exc.NoID()
-        async with sessions[
-            cls.__table_args__.get("comment", "main")
-        ].begin() as session:
+        async with cls._session() as session:
             cls = (
                 (await session.execute(select(cls).filter_by(id=id))).scalars().first()
             )
+            cls._invalidate_caches()
+            audits = []
             for key, value in kwargs.items():
                 if getattr(cls, key) == value:
                     continue
                 if not ignore_blacklist and cls._is_value_blacklisted(key, value):
                     raise database_exc.Blacklisted(key, value)
-                if key in getenv("CRYPT_VALUES", "").split(",") and not ignore_crypt:
+                if (
+                    key in ciphers.crypt_values
+                    and not ignore_crypt
+                    and not isinstance(value, Hashed)
+                ):
                     value = cls._crypt(value)
                 old_value = getattr(cls, key)
                 if not isinstance(old_value, (int, float, str, bool, type(None))):
                     old_value = str(old_value)
-                await AuditLog.add(
-                    old_value=old_value,
-                    new_value=value
-                    if isinstance(value, (int, float, str, bool, type(None)))
-                    else str(value),
-                    key=key,
-                    origin_id=cls.id,
-                    origin_table=cls.__tablename__,
+                audits.append(
+                    {
+                        "old_value": old_value,
+                        "new_value": value
+                        if isinstance(value, (int, float, str, bool, type(None)))
+                        else str(value),
+                        "key": key,
+                        "origin_id": cls.id,
+                        "origin_table": cls.__tablename__,
+                    }
                 )
                 setattr(cls, key, value)
+            cls._bloom_add([kwargs])
+            if audits and AuditLog._database() == cls._database():
+                await AuditLog._write(session, audits)
             await session.commit()
-        perfomance.all += [(datetime.now() - start_at).total_seconds()]
+        if audits and AuditLog._database() != cls._database():
+            async with AuditLog._session() as session:
+                await AuditLog._write(session, audits)
+                await session.commit()
+        cls._invalidate_caches()
+        perfomance.record(
+            "update", cls.__tablename__, (datetime.now() - start_at).total_seconds()
+        )
         db_debug(f"UPDATE {cls}")
         return cls
 
@@ -293,49 +790,130 @@ class BaseItem(Base):
             List[Self]: A list of items that match the search criteria.
         """
         start_at = datetime.now()
-        async with sessions[
-            cls.__table_args__.get("comment", "main")
-        ].begin() as session:
-            keys = []
-            for key in cls.__dict__.keys():
-                if key.startswith("_") or not cls.__dict__[key]:
-                    continue
-                data = cls.__dict__[key]
-                info = {}
-                if "info" in data.__dict__.keys():
-                    info = data.__dict__["info"]
-                if not info.get("searchable", False) and not search_all:
-                    continue
-                elif not info.get("safe", False) and safe:
-                    continue
-                keys += [key]
-            items = []
-            for key in keys:
-                items.extend(
-                    (
-                        await session.execute(
-                            select(cls)
-                            .where(getattr(cls, key).ilike(f"%{query}%"))
-                            .filter_by(**filters)
+        async with cls._session(write=False) as session:
+            keys = cls._search_keys(safe, search_all)
+            index = cls.search_index()
+            if index and not search_all and index.supports(query, keys):
+                items = await index.search(
+                    session, query, keys, limit=limit, offset=offset, **filters
+                )
+            else:
+                items = []
+                for key in keys:
+                    items.extend(
+                        (
+                            await session.execute(
+                                select(cls)
+                                .where(getattr(cls, key).ilike(f"%{query}%"))
+                                .filter_by(**filters)
+                            )
                         )
+                        .scalars()
+                        .all()
                     )
-                    .scalars()
-                    .all()
+                items = await ranking.arank(
+                    sorted(set(items), key=lambda item: item.id), keys, query
                 )
-            items = list(set(items))
-            items = sorted(
-                items,
-                key=lambda item: max(
-                    cls.similarity(getattr(item, key), query) for key in keys
-                ),
-                reverse=True,
-            )
-            items = items[offset : (offset + limit) if limit != -1 else len(items)]
-        perfomance.all += [(datetime.now() - start_at).total_seconds()]
+                items = items[offset : (offset + limit) if limit != -1 else len(items)]
+        perfomance.record(
+            "search", cls.__tablename__, (datetime.now() - start_at).total_seconds()
+        )
         db_debug(f"SEARCH {items}")
         return items
 
     @classmethod
+    async def search_page(
+        cls,
+        query: str,
+        limit: int = 100,
+        cursor: str = None,
+        safe: bool = True,
+        search_all: bool = False,
+        **filters,
+    ) -> Tuple[List[Self], str | None]:
+        """
+        Cursor-paginated search().
+
+        With a search index, pages are keyed on (rank, id) so every page is one
+        ranked query no matter how deep it is. Without one the cursor wraps an offset.
+
+        Args:
+            query (str): The search query string.
+            limit (int, optional): The maximum number of items to return. Defaults to 100.
+            cursor (str, optional): the continuation token of the previous page. Defaults to None.
+            safe (bool, optional): Whether to restrict search to safe fields. Defaults to True.
+            search_all (bool, optional): Whether to search all fields regardless of their searchability. Defaults to False.
+            **filters: Additional filters to apply to the search.
+
+        Returns:
+            A list of items and the continuation token of the next page (None on the last page)
+        """
+        after = cls._decode_cursor(cursor) if cursor else None
+        keys = cls._search_keys(safe, search_all)
+        index = cls.search_index()
+        if not (index and not search_all and index.supports(query, keys)):
+            offset = after[0] if after else 0
+            items = await cls.search(
+                query, limit + 1, offset, safe=safe, search_all=search_all, **filters
+            )
+            if len(items) <= limit:
+                return items, None
+            return items[:limit], cls._encode_cursor([offset + limit])
+        start_at = datetime.now()
+        async with cls._session(write=False) as session:
+            rows = await index.search_after(
+                session, query, keys, limit=limit + 1, after=after, **filters
+            )
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = cls._encode_cursor([rows[-1][1], rows[-1][0].id])
+        perfomance.record(
+            "search", cls.__tablename__, (datetime.now() - start_at).total_seconds()
+        )
+        db_debug(f"SEARCH PAGE {rows}")
+        return [row[0] for row in rows], next_cursor
+
+    @classmethod
+    def _search_keys(cls, safe: bool = True, search_all: bool = False) -> List[str]:
+        keys = []
+        for key in cls.__dict__.keys():
+            if key.startswith("_") or not cls.__dict__[key]:
+                continue
+            data = cls.__dict__[key]
+            info = {}
+            if "info" in data.__dict__.keys():
+                info = data.__dict__["info"]
+            if not info.get("searchable", False) and not search_all:
+                continue
+            elif not info.get("safe", False) and safe:
+                continue
+            keys += [key]
+        return keys
+
+    @classmethod
+    def search_index(cls) -> FullTextIndex | None:
+        """
+        Returns the FTS5 index of the model if it has `__fts__ = True`, None otherwise.
+        """
+        if not cls.__fts__:
+            return None
+        return FullTextIndex(cls, cls._search_keys(safe=False))
+
+    @classmethod
+    async def rebuild_search_index(cls) -> None:
+        """
+        Creates the model's FTS5 index if missing and refills it from the table.
+        """
+        index = cls.search_index()
+        if not index:
+            return
+        async with engines[cls._database()].begin() as conn:
+            if not await index.create(conn):
+                await index.rebuild(conn)
+        db_debug(f"REBUILT SEARCH INDEX {index.name}")
+
+    @itemmethod
     async def delete(cls, id: int = None, iknowwhatimdoing: bool = False, **filters):
         """
         Deletes an item from the database.
@@ -354,15 +932,16 @@ class BaseItem(Base):
             id = cls.id if cls.id else None
         if not id:
             raise database_exc.NoID()
-        async with sessions[
-            cls.__table_args__.get("comment", "main")
-        ].begin() as session:
+        async with cls._session() as session:
             cls = (
                 (await session.execute(select(cls).filter_by(id=id))).scalars().first()
             )
             await session.delete(cls)
             await session.commit()
-        perfomance.all += [(datetime.now() - start_at).total_seconds()]
+        cls._invalidate_caches()
+        perfomance.record(
+            "delete", cls.__tablename__, (datetime.now() - start_at).total_seconds()
+        )
         db_debug(f"DELETE {cls}")
         return cls
 
@@ -376,22 +955,20 @@ class BaseItem(Base):
     async def _filter_by(
         cls, items: List[Self], strict: bool = False, **filters
     ) -> List[Self]:
-        result_items = []
-        for item in items:
-            matches = True
-            for key, value in filters.items():
-                item_value = getattr(item, key, "")
-                if strict:
-                    if item_value != value:
-                        matches = False
-                        break
-                else:
-                    if cls.similarity(item_value, value) < 0.5:
-                        matches = False
-                        break
-            if matches:
-                result_items.append(item)
-        return result_items
+        if strict:
+            return [
+                item
+                for item in items
+                if all(
+                    getattr(item, key, "") == value for key, value in filters.items()
+                )
+            ]
+        keep = np.ones(len(items), dtype=bool)
+        for key, value in filters.items():
+            keep &= (
+                await ranking.ascore([getattr(item, key, "") for item in items], value)
+            ) >= 0.5
+        return [item for item, kept in zip(items, keep) if kept]
 
     @classmethod
     async def _sort_by(
@@ -401,32 +978,185 @@ class BaseItem(Base):
 
     @classmethod
     def _crypt(cls, value: str, crypt_key: str = None) -> str:
-        if not crypt_key:
-            crypt_key = getenv("CRYPT_KEY", None)
-        if not crypt_key:
-            raise database_exc.NoCryptKey()
-        crypt = Fernet(crypt_key.encode("utf-8"))
-        return crypt.encrypt(value.encode()).decode()
+        if crypt_key:
+            return Fernet(crypt_key.encode("utf-8")).encrypt(value.encode()).decode()
+        return ciphers.encrypt(value)
 
     @classmethod
     def _decrypt(cls, value: str, crypt_key: str = None) -> str:
-        if not crypt_key:
-            crypt_key = getenv("CRYPT_KEY", None)
-        if not crypt_key:
-            raise database_exc.NoCryptKey()
-        crypt = Fernet(crypt_key.encode("utf-8"))
-        return crypt.decrypt(value.encode()).decode()
+        if crypt_key:
+            return Fernet(crypt_key.encode("utf-8")).decrypt(value.encode()).decode()
+        return ciphers.decrypt(value)
 
     @classmethod
     def _compare(
         cls, decrypted_value: str, encrypted_value: str, crypt_key: str = None
     ) -> bool:
-        if not crypt_key:
-            crypt_key = getenv("CRYPT_KEY", None)
-        if not crypt_key:
-            raise database_exc.NoCryptKey()
-        crypt = Fernet(crypt_key.encode("utf-8"))
-        return crypt.decrypt(encrypted_value.encode()).decode() == decrypted_value
+        return cls._decrypt(encrypted_value, crypt_key) == decrypted_value
+
+    @classmethod
+    def decrypt_many(cls, items: List[Self]) -> List[Self]:
+        """
+        Decrypts the CRYPT_VALUES columns of many items in place.
+        """
+        keys = [
+            key for key in cls.__table__.columns.keys() if key in ciphers.crypt_values
+        ]
+        for key in keys:
+            loaded = [
+                item
+                for item in items
+                if item.__dict__.get(key) is not None
+                and not Hashed.matches_format(item.__dict__[key])
+            ]
+            for item, value in zip(
+                loaded, ciphers.decrypt_many(item.__dict__[key] for item in loaded)
+            ):
+                item.__dict__[key] = value
+        return items
+
+    @classmethod
+    async def rotate_encryption(cls, chunk_size: int = 500) -> int:
+        """
+        Re-encrypts every stored CRYPT_VALUES column with the primary CRYPT_KEY.
+
+        Rows are rewritten one chunk per transaction, so the service keeps running
+        while values are rotated. Each chunk is read and rewritten in the same writer
+        transaction, so an update() can't land in between and be overwritten.
+        Values that don't decrypt with a known key are left as is.
+
+        Returns:
+            int: The number of rewritten rows
+        """
+        keys = [
+            key for key in cls.__table__.columns.keys() if key in ciphers.crypt_values
+        ]
+        if not keys:
+            return 0
+        rotated = 0
+        columns = [cls.id] + [getattr(cls, key) for key in keys]
+        last_id = 0
+        while True:
+            async with cls._session() as session:
+                rows = (
+                    await session.execute(
+                        select(*columns)
+                        .where(cls.id > last_id)
+                        .order_by(cls.id)
+                        .limit(chunk_size)
+                    )
+                ).all()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                changes = []
+                for row in rows:
+                    change = {
+                        key: ciphers.rotate(value)
+                        for key, value in zip(keys, row[1:])
+                        if isinstance(value, str)
+                    }
+                    change = {key: value for key, value in change.items() if value}
+                    if change:
+                        changes.append({"id": row[0], **change})
+                if changes:
+                    await session.execute(sql_update(cls), changes)
+                    await session.commit()
+            for change in changes:
+                cls._drop_caches({"id": change["id"]})
+            rotated += len(changes)
+            await async_sleep(0)
+        db_debug(f"ROTATED {cls.__name__} x{rotated}")
+        return rotated
+
+    @classmethod
+    def _prepare_row(
+        cls, row: dict, ignore_crypt: bool = False, ignore_blacklist: bool = True
+    ) -> dict:
+        return cls._prepare_rows([row], ignore_crypt, ignore_blacklist)[0]
+
+    @classmethod
+    def _prepare_rows(
+        cls, rows: List[dict], ignore_crypt: bool = False, ignore_blacklist: bool = True
+    ) -> List[dict]:
+        """
+        Checks the rows against the blacklists and encrypts their CRYPT_VALUES
+        columns in one batch per column.
+        """
+        if not ignore_blacklist:
+            for row in rows:
+                for key, value in row.items():
+                    if cls._is_value_blacklisted(key, value):
+                        raise database_exc.Blacklisted(key, value)
+        if ignore_crypt:
+            return [dict(row) for row in rows]
+        return ciphers.encrypt_rows(rows)
+
+    @staticmethod
+    async def _chunked(
+        rows: Iterable[dict] | AsyncIterable[dict], size: int
+    ) -> AsyncIterable[List[dict]]:
+        chunk = []
+        if hasattr(rows, "__aiter__"):
+            async for row in rows:
+                chunk.append(row)
+                if len(chunk) >= size:
+                    yield chunk
+                    chunk = []
+        else:
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= size:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _after_clause(keys: tuple, after: list, desc: bool = False):
+        """
+        Keyset condition for rows after the cursor of get_page().
+
+        SQLite sorts NULLs first ascending and last descending, and `(NULL, id) > ...`
+        is never true, so a nullable order column gets explicit NULL branches.
+        """
+        if len(keys) == 1 or not keys[0].nullable:
+            return (
+                (tuple_(*keys) < tuple_(*after))
+                if desc
+                else (tuple_(*keys) > tuple_(*after))
+            )
+        (column, id_column), (value, last_id) = keys, after
+        if value is None:
+            if desc:
+                return and_(column.is_(None), id_column < last_id)
+            return or_(
+                and_(column.is_(None), id_column > last_id), column.is_not(None)
+            )
+        if desc:
+            return or_(tuple_(*keys) < tuple_(*after), column.is_(None))
+        return tuple_(*keys) > tuple_(*after)
+
+    @staticmethod
+    def _encode_cursor(values: list) -> str:
+        values = [
+            {"dt": value.isoformat()} if isinstance(value, datetime) else value
+            for value in values
+        ]
+        return urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str, keys: tuple = None) -> list:
+        try:
+            values = json.loads(urlsafe_b64decode(cursor.encode()))
+        except Exception:
+            raise database_exc.Invalid(f"Invalid cursor {cursor}")
+        if not isinstance(values, list) or (keys and len(values) != len(keys)):
+            raise database_exc.Invalid(f"Invalid cursor {cursor}")
+        return [
+            datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+            for value in values
+        ]
 
     @classmethod
     def _generate_secret(cls, length: int = 32) -> str:
@@ -436,16 +1166,134 @@ class BaseItem(Base):
             secret = secret[0:28] + "." + secret[30:]
         return secret
 
+    @classmethod
+    async def build_bloom_filters(cls, batch_size: int = 10_000) -> None:
+        """
+        Builds the filters of the __bloom__ columns by streaming the table, then
+        swaps them in at once. Until then is_taken() always queries the database.
+
+        Values written while the table is streamed go to both the current and the
+        new filters, so the swap can't lose them.
+        """
+        if not cls.__bloom__:
+            return
+        start_at = datetime.now()
+        columns = [getattr(cls, column) for column in cls.__bloom__]
+        async with cls._session(write=False) as session:
+            count = await session.scalar(select(func.count()).select_from(cls))
+        filters = {
+            column: BloomFilter(max(count * 2, bloom_capacity), bloom_error_rate)
+            for column in cls.__bloom__
+        }
+        cls._bloom_building = filters
+        try:
+            async with cls._session(write=False) as session:
+                result = await session.stream(
+                    select(*columns).execution_options(yield_per=batch_size)
+                )
+                async for row in result:
+                    for column, value in zip(cls.__bloom__, row):
+                        if value is not None:
+                            filters[column].add(value)
+            cls._bloom_filters = filters
+        finally:
+            cls._bloom_building = None
+        perfomance.record(
+            "bloom", cls.__tablename__, (datetime.now() - start_at).total_seconds()
+        )
+        logger.info(f"Built bloom filters of {cls.__tablename__} ({count} rows)")
+
+    @classmethod
+    def _bloom_add(cls, rows: Iterable[dict]) -> None:
+        rows = list(rows)
+        for filters in (cls._bloom_filters, cls._bloom_building or {}):
+            for column, bloom in filters.items():
+                for row in rows:
+                    if row.get(column) is not None:
+                        bloom.add(row[column])
+
+    @classmethod
+    def bloom_stats(cls) -> Dict[str, dict]:
+        return {column: bloom.stats() for column, bloom in cls._bloom_filters.items()}
+
     @classmethod
     def _is_value_blacklisted(cls, key: str, value: str) -> bool:
-        blacklist_file = f"./core/database/blacklists/{key}.txt"
-        if os.path.exists(blacklist_file):
-            with open(blacklist_file) as f:
-                for line in f:
-                    if line.strip() == str(value):
-                        return True
+        return blacklists.is_blacklisted(key, value)
+
+    @classmethod
+    def _row_cache(cls) -> RowCache | None:
+        """
+        Returns the model's row cache, None if __row_cache__ is off or inside a
+        transaction(), where reads must see the unit's uncommitted writes.
+        """
+        if not cls.__row_cache__ or unit_of_work.get() is not None:
+            return None
+        cache = row_caches.get(cls.__tablename__)
+        if cache is None:
+            cache = row_caches[cls.__tablename__] = RowCache(
+                [
+                    column.key
+                    for column in cls.__table__.columns
+                    if column.primary_key or column.unique
+                ],
+                maxsize=int(getenv("ROW_CACHE_SIZE", 10_000)),
+                ttl=float(getenv("ROW_CACHE_TTL", 300)),
+                max_bytes=int(getenv("ROW_CACHE_MEMORY", 32 * 1024 * 1024)),
+            )
+        return cache
+
+    def _snapshot(self) -> dict:
+        return {
+            attr.key: getattr(self, attr.key) for attr in self.__mapper__.column_attrs
+        }
+
+    @classmethod
+    def _from_snapshot(cls, row: dict) -> Self:
+        """
+        Builds a new detached instance from a cached row, so callers never share
+        (or mutate) the cached copy.
+        """
+        item = cls()
+        for key, value in row.items():
+            setattr(
+                item, key, deepcopy(value) if isinstance(value, (dict, list)) else value
+            )
+        make_transient_to_detached(item)
+        return item
 
-        return False
+    def _invalidate_caches(self) -> None:
+        """
+        Called by update() and delete() for the affected row.
+
+        Inside a transaction() the row's cache keys are dropped again once the unit
+        commits, since rows read by other requests in between still hold the
+        committed values. Only the plain keys are kept for that, not the instance,
+        which a rollback expires.
+        """
+        keys = self._cache_keys()
+        unit = unit_of_work.get()
+        if unit is not None and self._database() in unit:
+            unit[self._database()].info.setdefault("invalidate", []).append(
+                (type(self), keys)
+            )
+        self._drop_caches(keys)
+
+    def _cache_keys(self) -> dict:
+        """
+        The values _drop_caches() needs to find the row's cache entries,
+        override to add more (calling super()).
+        """
+        return {"id": self.id}
+
+    @classmethod
+    def _drop_caches(cls, keys: dict) -> None:
+        """
+        Drops everything cached for the row with these keys, override to drop
+        anything else cached for it (calling super()).
+        """
+        cache = row_caches.get(cls.__tablename__)
+        if cache is not None:
+            cache.invalidate(keys["id"])
 
     def decrypted(self) -> Self:
         """
@@ -458,32 +1306,23 @@ class BaseItem(Base):
             Self: A new instance of the item with decrypted values.
         """
         for key, value in self.__dict__.items():
-            if key in getenv("CRYPT_VALUES", "").split(","):
+            if key in ciphers.crypt_values and not Hashed.matches_format(value):
                 self.__dict__[key] = self._decrypt(value)
         return self
 
-    async def get_audit(self) -> Dict[str, List["AuditLog"]]:
+    async def get_audit(self, **kwargs) -> "AuditTimeline":
         """
-        Gets all audit logs for the current item.
+        Gets all audit logs for the current item in one query.
 
-        This method returns a dictionary with all keys being the column names of the item
-        and the values being lists of AuditLog objects.
+        Args:
+            **kwargs: passed to AuditLog.timeline (since, until, keys, limit, cursor)
 
         Returns:
-            Dict[str, List["AuditLog"]]: A dictionary with all audit logs for the item.
+            AuditTimeline: the audit logs, grouped by key as attributes (e.g. `audit.username`)
         """
-        for key in self.__dict__.keys():
-            if key.startswith("_"):
-                continue
-            setattr(
-                self.audit,
-                key,
-                await AuditLog.get_all(
-                    origin_table=self.__tablename__, origin_id=self.id, key=key
-                ),
-            )
-        db_debug(f"GET AUDIT {self.audit}")
-        return self.audit
+        audit = await AuditLog.timeline(self, **{"limit": None, **kwargs})
+        db_debug(f"GET AUDIT {audit}")
+        return audit
 
     def __repr__(self) -> str:
         return f"<{self.__class__.__name__} {self.id}>"
@@ -503,6 +1342,16 @@ class ServerSetting(BaseItem):
 class User(BaseItem):
     __tablename__ = "users"
     __table_args__ = {"comment": "main"}
+    __fts__ = True
+    __bloom__ = ("username", "email")
+    __row_cache__ = True
+    __hot_filters__ = (
+        ("id",),
+        ("username",),
+        ("email",),
+        ("email_confirm_code",),
+        ("reg_ip",),
+    )
 
     username = Column(
         String(48), unique=True, nullable=False, info={"searchable": True, "safe": True}
@@ -511,59 +1360,58 @@ class User(BaseItem):
     email = Column(String(128), unique=True)
     password = Column(String(256))
     reg_type = Column(String(32))
-    email_confirm_code = Column(String(64))
+    email_confirm_code = Column(String(64), index=True)
     groups = Column(JSON)
     email_confirmed = Column(Boolean)
-    reg_ip = Column(String(48))
-
-    @reconstructor
-    def init_on_load(self) -> None:
-        super().init_on_load()
-        self.get_sessions = lambda: self.__class__.get_sessions(id=self.id)
-        self.create_session = lambda **kwargs: self.__class__.create_session(
-            cls=self, id=self.id, **kwargs
-        )
+    reg_ip = Column(String(48), index=True)
 
+    @itemmethod
     async def create_session(cls, id: int = None, **kwargs) -> "Session":
         start_at = datetime.now()
         if not id and hasattr(cls, "id"):
             id = cls.id
         if not id:
             raise database_exc.NoID()
-        async with sessions[
-            cls.__table_args__.get("comment", "main")
-        ].begin() as session:
+        async with Session._session() as session:
             _ = Session(user_id=id, token=cls._generate_secret(72), **kwargs)
             session.add(_)
             await session.commit()
-        perfomance.all += [(datetime.now() - start_at).total_seconds()]
+        perfomance.record(
+            "add", Session.__tablename__, (datetime.now() - start_at).total_seconds()
+        )
         return _
 
-    @classmethod
+    @itemmethod
     async def get_sessions(cls, id: int = None) -> List["Session"]:
         start_at = datetime.now()
         if not id and hasattr(cls, "id"):
             id = cls.id
         if not id:
             raise database_exc.NoID()
-        async with sessions[
-            cls.__table_args__.get("comment", "main")
-        ].begin() as session:
+        async with Session._session(write=False) as session:
             _ = (
                 (await session.execute(select(Session).filter_by(user_id=id)))
                 .scalars()
                 .all()
             )
-        perfomance.all += [(datetime.now() - start_at).total_seconds()]
+        perfomance.record(
+            "get", Session.__tablename__, (datetime.now() - start_at).total_seconds()
+        )
         return _
 
+    @classmethod
+    def _drop_caches(cls, keys: dict) -> None:
+        super()._drop_caches(keys)
+        token_cache.invalidate_user(keys["id"])
+
 
 class Session(BaseItem):
     __tablename__ = "sessions"
     __table_args__ = {"comment": "main"}
+    __hot_filters__ = (("id",), ("token",), ("user_id",))
 
-    user_id = Column(Integer, ForeignKey(User.id), nullable=False)
-    token = Column(String(256), nullable=False)
+    user_id = Column(Integer, ForeignKey(User.id), nullable=False, index=True)
+    token = Column(String(256), nullable=False, index=True)
     ip = Column(String(32))
     user_agent = Column(String(256))
     last_used = Column(DateTime(timezone=True))
@@ -576,15 +1424,79 @@ class Session(BaseItem):
 
     @classmethod
     async def get_user(cls, token: str) -> "User":
+        if not token:
+            return None
+        cache = cls._token_cache()
+        if cache is not None:
+            row = cache.get(token)
+            if row is not None:
+                return User._from_snapshot(row)
+            generation = cache.generation
         session = await Session.get(token=token)
         if not session or session.is_deleted:
             return None
-        return await User.get(id=session.user_id)
+        user = await User.get(id=session.user_id)
+        if cache is not None and user is not None:
+            cache.store(token, user._snapshot(), generation)
+        return user
+
+    @classmethod
+    def _token_cache(cls) -> TokenCache | None:
+        """
+        Returns the token cache, None inside a transaction() for the same reason
+        as _row_cache(): the unit's reads see its uncommitted writes.
+        """
+        return None if unit_of_work.get() is not None else token_cache
+
+    def _cache_keys(self) -> dict:
+        return {**super()._cache_keys(), "token": self.token}
+
+    @classmethod
+    def _drop_caches(cls, keys: dict) -> None:
+        super()._drop_caches(keys)
+        if keys.get("token"):
+            token_cache.invalidate(keys["token"])
+
+
+class AuditTimeline:
+    """
+    Result of AuditLog.timeline(): the entries in id (time) order, grouped by key,
+    reachable as attributes too (`timeline.username`), and by item.
+    """
+
+    def __init__(self, entries: List["AuditLog"], cursor: str | None = None):
+        self.entries = entries
+        self.cursor = cursor
+        self.by_key: Dict[str, List["AuditLog"]] = {}
+        self.by_item: Dict[Tuple[str, int], List["AuditLog"]] = {}
+        for entry in entries:
+            self.by_key.setdefault(entry.key, []).append(entry)
+            self.by_item.setdefault((entry.origin_table, entry.origin_id), []).append(
+                entry
+            )
+
+    def of(self, item: "BaseItem") -> "AuditTimeline":
+        return AuditTimeline(self.by_item.get((item.__tablename__, item.id), []))
+
+    def __getattr__(self, key: str) -> List["AuditLog"]:
+        if key.startswith("__"):
+            raise AttributeError(key)
+        return self.by_key.get(key, [])
+
+    def __getitem__(self, key: str) -> List["AuditLog"]:
+        return self.by_key.get(key, [])
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __repr__(self) -> str:
+        return f'<Audit audits={len(self.entries)} [{", ".join(self.by_key)}]>'
 
 
 class AuditLog(BaseItem):
     __tablename__ = "audit_logs"
     __table_args__ = {"comment": "main"}
+    __hot_filters__ = (("origin_table", "origin_id", "key"),)
 
     updated_at = None
     is_deleted = None
@@ -594,34 +1506,291 @@ class AuditLog(BaseItem):
     old_value = Column(String(256), info={"searchable": True})
     new_value = Column(String(256), info={"searchable": True})
 
-    @reconstructor
-    def init_on_load(self) -> None:
-        super().init_on_load()
-        self.search = lambda **kwargs: self.__class__.search(
-            safe=False if "safe" not in kwargs else kwargs["safe"],
-            **{k: v for k, v in kwargs.items() if k != "safe"},
+    search = itemmethod(BaseItem.search.__func__, bind_id=False, safe=False)
+
+    @classmethod
+    async def timeline(
+        cls,
+        items: BaseItem | Iterable[BaseItem],
+        since: datetime = None,
+        until: datetime = None,
+        keys: Iterable[str] = None,
+        limit: int | None = 1000,
+        cursor: str = None,
+        desc: bool = False,
+    ) -> AuditTimeline:
+        """
+        Gets the audit history of one or many items in a single query on the
+        (origin_table, origin_id, key) index.
+
+        Args:
+            items (BaseItem | Iterable[BaseItem]): the item(s), may be of different models
+            since (datetime, optional): only entries created at or after. Defaults to None.
+            until (datetime, optional): only entries created before. Defaults to None.
+            keys (Iterable[str], optional): only entries of these columns. Defaults to None.
+            limit (int | None, optional): entries per page, None for all. Defaults to 1000.
+            cursor (str, optional): the cursor of the previous page. Defaults to None.
+            desc (bool, optional): Whether to return the newest entries first. Defaults to False.
+
+        Returns:
+            AuditTimeline: the entries and the cursor of the next page (None on the last page)
+        """
+        start_at = datetime.now()
+        if isinstance(items, BaseItem):
+            items = [items]
+        origins = {}
+        for item in items:
+            origins.setdefault(item.__tablename__, []).append(item.id)
+        if not origins:
+            return AuditTimeline([])
+        stmt = select(cls).where(
+            or_(
+                *[
+                    and_(cls.origin_table == table, cls.origin_id.in_(ids))
+                    for table, ids in origins.items()
+                ]
+            )
+        )
+        if keys is not None:
+            stmt = stmt.where(cls.key.in_(list(keys)))
+        if since is not None:
+            stmt = stmt.where(cls.created_at >= since)
+        if until is not None:
+            stmt = stmt.where(cls.created_at < until)
+        if cursor:
+            (after,) = cls._decode_cursor(cursor, (cls.id,))
+            stmt = stmt.where(cls.id < after if desc else cls.id > after)
+        stmt = stmt.order_by(cls.id.desc() if desc else cls.id)
+        if limit is not None:
+            stmt = stmt.limit(limit + 1)
+        async with cls._session(write=False) as session:
+            entries = (await session.execute(stmt)).scalars().all()
+        next_cursor = None
+        if limit is not None and len(entries) > limit:
+            entries = entries[:limit]
+            next_cursor = cls._encode_cursor([entries[-1].id])
+        perfomance.record(
+            "get", cls.__tablename__, (datetime.now() - start_at).total_seconds()
         )
+        return AuditTimeline(entries, next_cursor)
 
     @classmethod
     async def add(cls, **kwargs):
         await super().add(**kwargs)
-        await cls._delete_old_audits(
-            kwargs["key"], kwargs["origin_table"], kwargs["origin_id"]
+        if not audit_compact_interval:
+            async with cls._session() as session:
+                await cls._delete_old_audits(
+                    session, kwargs["origin_table"], kwargs["origin_id"], [kwargs["key"]]
+                )
+                await session.commit()
+
+    @classmethod
+    async def _write(cls, session: AsyncSession, audits: List[dict]) -> None:
+        """
+        Writes audit entries as one multi-row INSERT inside the caller's transaction
+        and prunes the history of the touched keys.
+        """
+        await session.execute(insert(cls).values(audits))
+        if not audit_compact_interval:
+            await cls._delete_old_audits(
+                session,
+                audits[0]["origin_table"],
+                audits[0]["origin_id"],
+                [audit["key"] for audit in audits],
+            )
+
+    @classmethod
+    async def _delete_old_audits(
+        cls,
+        session: AsyncSession,
+        origin_table: str = None,
+        origin_id: int = None,
+        keys: List[str] = None,
+    ) -> int:
+        """
+        Deletes all but the newest MAX_AUDITS_PER_ITEM entries per (origin_table, origin_id, key)
+        with a single DELETE. Without arguments the whole table is compacted.
+        """
+        ranked = select(
+            cls.id,
+            func.row_number()
+            .over(
+                partition_by=(cls.origin_table, cls.origin_id, cls.key),
+                order_by=cls.id.desc(),
+            )
+            .label("rank"),
+        )
+        if origin_table is not None:
+            ranked = ranked.where(cls.origin_table == origin_table)
+        if origin_id is not None:
+            ranked = ranked.where(cls.origin_id == origin_id)
+        if keys is not None:
+            ranked = ranked.where(cls.key.in_(keys))
+        ranked = ranked.subquery()
+        result = await session.execute(
+            delete(cls).where(
+                cls.id.in_(
+                    select(ranked.c.id).where(
+                        ranked.c.rank > int(getenv("MAX_AUDITS_PER_ITEM", 4))
+                    )
+                )
+            )
+        )
+        return result.rowcount
+
+    @classmethod
+    async def compact(cls) -> int:
+        """
+        Enforces MAX_AUDITS_PER_ITEM over the whole audit table.
+
+        Returns:
+            int: The number of deleted audit entries
+        """
+        start_at = datetime.now()
+        async with cls._session() as session:
+            deleted = await cls._delete_old_audits(session)
+            await session.commit()
+        perfomance.record(
+            "delete", cls.__tablename__, (datetime.now() - start_at).total_seconds()
         )
+        db_debug(f"COMPACT AUDITS {deleted}")
+        return deleted
+
+    @classmethod
+    async def compact_forever(cls) -> None:
+        while True:
+            await async_sleep(audit_compact_interval)
+            try:
+                await cls.compact()
+            except Exception as exc:
+                logger.error(f"Error while compacting audit logs: {exc}")
+
+
+class EmailOutbox(BaseItem):
+    """
+    Durable queue of outgoing emails: Email.send() only adds a row, the SMTP
+    workers claim due rows in batches and record the outcome.
+    """
+
+    __tablename__ = "email_outbox"
+    __table_args__ = {"comment": "main"}
+    __hot_filters__ = (("status", "next_attempt_at"),)
+
+    to_addr = Column(String(256), nullable=False)
+    from_addr = Column(String(256), nullable=False)
+    subject = Column(String(256))
+    body = Column(String)
+    status = Column(String(16), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True))
+    sent_at = Column(DateTime(timezone=True))
+    last_error = Column(String(512))
 
     @classmethod
-    async def _delete_old_audits(cls, key, origin_table, origin_id):
-        async with sessions[cls.__table_args__["comment"]].begin() as session:
+    async def claim(cls, limit: int = 20) -> List[Self]:
+        """
+        Marks up to `limit` due pending emails as sending and returns them. Claims go
+        through the single writer connection, so two workers never get the same row.
+        """
+        start_at = datetime.now()
+        due = (
+            select(cls.id)
+            .where(cls.status == "pending", cls.next_attempt_at <= datetime.now())
+            .order_by(cls.next_attempt_at, cls.id)
+            .limit(limit)
+        )
+        async with cls._session() as session:
+            items = (
+                (
+                    await session.execute(
+                        sql_update(cls)
+                        .where(cls.id.in_(due))
+                        .values(status="sending", attempts=cls.attempts + 1)
+                        .returning(cls)
+                        .execution_options(synchronize_session=False)
+                    )
+                )
+                .scalars()
+                .all()
+            )
+            await session.commit()
+        perfomance.record(
+            "update", cls.__tablename__, (datetime.now() - start_at).total_seconds()
+        )
+        return items
+
+    @classmethod
+    async def finish(
+        cls,
+        sent: List[int],
+        retry: Dict[int, Tuple[str, datetime]] = None,
+        failed: Dict[int, str] = None,
+    ) -> None:
+        """
+        Records the outcome of a batch: sent ids, ids to retry with (error, retry at),
+        and ids that failed for good with their error.
+        """
+        start_at = datetime.now()
+        async with cls._session() as session:
+            if sent:
+                await session.execute(
+                    sql_update(cls)
+                    .where(cls.id.in_(sent))
+                    .values(status="sent", sent_at=datetime.now(), last_error=None)
+                    .execution_options(synchronize_session=False)
+                )
+            for id, (error, at) in (retry or {}).items():
+                await session.execute(
+                    sql_update(cls)
+                    .where(cls.id == id)
+                    .values(
+                        status="pending", next_attempt_at=at, last_error=error[:512]
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+            for id, error in (failed or {}).items():
+                await session.execute(
+                    sql_update(cls)
+                    .where(cls.id == id)
+                    .values(status="failed", last_error=error[:512])
+                    .execution_options(synchronize_session=False)
+                )
+            await session.commit()
+        perfomance.record(
+            "update", cls.__tablename__, (datetime.now() - start_at).total_seconds()
+        )
+
+    @classmethod
+    async def recover(cls) -> int:
+        """
+        Puts emails left in "sending" by a previous run back in the queue.
+        """
+        async with cls._session() as session:
             result = await session.execute(
-                select(cls)
-                .filter_by(key=key, origin_table=origin_table, origin_id=origin_id)
-                .order_by(cls.id.desc())
+                sql_update(cls)
+                .where(cls.status == "sending")
+                .values(status="pending")
+                .execution_options(synchronize_session=False)
             )
-            audits = result.scalars().all()
-            if len(audits) > int(getenv("MAX_AUDITS_PER_ITEM", 4)):
-                for audit in audits[int(getenv("MAX_AUDITS_PER_ITEM", 4)) :]:
-                    await session.delete(audit)
             await session.commit()
+        return result.rowcount
+
+    @classmethod
+    async def depth(cls) -> Dict[str, int]:
+        """
+        Returns the number of emails in each status.
+        """
+        async with cls._session(write=False) as session:
+            rows = await session.execute(
+                select(cls.status, func.count()).group_by(cls.status)
+            )
+            return {status: count for status, count in rows.all()}
+
+
+Index(
+    "ix_audit_logs_origin", AuditLog.origin_table, AuditLog.origin_id, AuditLog.key
+)
+Index("ix_email_outbox_due", EmailOutbox.status, EmailOutbox.next_attempt_at)
 
 
 async def create_tables():
@@ -631,12 +1800,100 @@ async def create_tables():
                 os.mkdir("./databases")
             async with engine.begin() as conn:
                 for table in Base.metadata.sorted_tables:
-                    if table.comment == name:
+                    if database_of(table) == name:
                         await conn.run_sync(table.create, checkfirst=True)
+                        for index in await migrate_indexes(conn, table):
+                            logger.info(f"Built index {index} on {table.name}")
+                for model in _models():
+                    index = model.search_index()
+                    if index and model._database() == name:
+                        if await index.create(conn):
+                            logger.info(f"Built search index {index.name}")
+        await explain_hot_queries()
     except Exception as exc:
         print("Error while creating tables:", exc)
 
 
+async def migrate_indexes(conn: AsyncConnection, table: Table) -> List[str]:
+    """
+    Builds the indexes declared on the table that the database doesn't have yet,
+    so existing database files pick up new index declarations.
+
+    Returns:
+        List[str]: The names of the built indexes
+    """
+    existing = {
+        row[1]
+        for row in await conn.exec_driver_sql(f"PRAGMA index_list({table.name})")
+    }
+    built = []
+    for index in sorted(table.indexes, key=lambda index: index.name):
+        if index.name not in existing:
+            await conn.run_sync(index.create)
+            built.append(index.name)
+    return built
+
+
+async def explain_hot_queries() -> Dict[str, List[str]]:
+    """
+    Runs EXPLAIN QUERY PLAN for every model's __hot_filters__ lookups and warns
+    about the ones that still scan the whole table.
+
+    Returns:
+        Dict[str, List[str]]: The query plan of every hot lookup
+    """
+    plans = {}
+    for model in _models():
+        async with readers[model._database()].connect() as conn:
+            for keys in model.__hot_filters__:
+                stmt = select(model).filter_by(**{key: 0 for key in keys})
+                sql = str(
+                    stmt.compile(
+                        dialect=conn.dialect, compile_kwargs={"literal_binds": True}
+                    )
+                )
+                lookup = f"{model.__tablename__}({', '.join(keys)})"
+                plans[lookup] = [
+                    row[3]
+                    for row in await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)
+                ]
+                if any(
+                    detail.startswith("SCAN") and "INDEX" not in detail
+                    for detail in plans[lookup]
+                ):
+                    logger.warning(f"Full table scan on {lookup}: {plans[lookup]}")
+    return plans
+
+
+def _models() -> List[type]:
+    return [mapper.class_ for mapper in Base.registry.mappers]
+
+
+async def rotate_encryption() -> int:
+    """
+    Re-encrypts the encrypted columns of every model with the primary CRYPT_KEY.
+    """
+    rotated = 0
+    for model in _models():
+        rotated += await model.rotate_encryption()
+    if rotated:
+        logger.info(f"Re-encrypted {rotated} rows with the primary crypt key")
+    return rotated
+
+
+async def build_bloom_filters() -> None:
+    for model in _models():
+        await model.build_bloom_filters()
+
+
+async def rebuild_search_indexes() -> None:
+    """
+    Rebuilds the FTS5 search index of every model that has one.
+    """
+    for model in _models():
+        await model.rebuild_search_index()
+
+
 def create_db():
     if get_event_loop() is None:
         new_event_loop().run_until_completed(create_tables())
@@ -0,0 +1,156 @@
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
+from os import getenv
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+import hashlib
+import hmac
+import os
+from typing import Iterable, List
+import core.database.exceptions as database_exc
+
+
+class CipherRegistry:
+    """
+    Process-wide column encryption, built once from the environment.
+
+    CRYPT_KEY may hold several comma-separated Fernet keys: the first one encrypts,
+    all of them decrypt, so old keys keep working while values are rotated to the new one.
+    """
+
+    def __init__(self):
+        self._cipher = None
+        self._primary = None
+        self._crypt_values = None
+
+    def reload(self) -> None:
+        self._cipher = None
+        self._primary = None
+        self._crypt_values = None
+
+    @property
+    def keys(self) -> List[str]:
+        return [
+            key.strip() for key in getenv("CRYPT_KEY", "").split(",") if key.strip()
+        ]
+
+    @property
+    def cipher(self) -> MultiFernet:
+        if self._cipher is None:
+            keys = self.keys
+            if not keys:
+                raise database_exc.NoCryptKey()
+            fernets = [Fernet(key.encode("utf-8")) for key in keys]
+            self._primary = fernets[0]
+            self._cipher = MultiFernet(fernets)
+        return self._cipher
+
+    @property
+    def crypt_values(self) -> frozenset:
+        if self._crypt_values is None:
+            self._crypt_values = frozenset(
+                key for key in getenv("CRYPT_VALUES", "").split(",") if key
+            )
+        return self._crypt_values
+
+    def encrypt(self, value: str) -> str:
+        return self.cipher.encrypt(value.encode()).decode()
+
+    def decrypt(self, value: str) -> str:
+        return self.cipher.decrypt(value.encode()).decode()
+
+    def encrypt_many(self, values: Iterable[str]) -> List[str]:
+        encrypt = self.cipher.encrypt
+        return [encrypt(value.encode()).decode() for value in values]
+
+    def decrypt_many(self, values: Iterable[str]) -> List[str]:
+        decrypt = self.cipher.decrypt
+        return [decrypt(value.encode()).decode() for value in values]
+
+    def encrypt_rows(self, rows: Iterable[dict]) -> List[dict]:
+        """
+        Returns copies of the rows with every CRYPT_VALUES column encrypted, one
+        encrypt_many() per column. None and Hashed values are kept as is.
+        """
+        rows = [dict(row) for row in rows]
+        for key in self.crypt_values:
+            targets = [
+                row
+                for row in rows
+                if row.get(key) is not None and not isinstance(row[key], Hashed)
+            ]
+            for row, value in zip(
+                targets, self.encrypt_many(row[key] for row in targets)
+            ):
+                row[key] = value
+        return rows
+
+    def is_current(self, value: str) -> bool:
+        """
+        Whether the value is encrypted with the primary key.
+        """
+        self.cipher
+        try:
+            self._primary.decrypt(value.encode())
+            return True
+        except InvalidToken:
+            return False
+
+    def rotate(self, value: str) -> str | None:
+        """
+        Re-encrypts a value with the primary key.
+
+        Returns:
+            str | None: The new token, None if the value is current or isn't a token of a known key
+        """
+        if self.is_current(value):
+            return None
+        try:
+            return self.cipher.rotate(value.encode()).decode()
+        except InvalidToken:
+            return None
+
+
+ciphers = CipherRegistry()
+
+
+class Hashed(str):
+    """
+    A one-way password hash. Stored as is: add() and update() don't encrypt it.
+    """
+
+    PREFIX = "scrypt$"
+
+    @classmethod
+    def matches_format(cls, value) -> bool:
+        return isinstance(value, str) and value.startswith(cls.PREFIX)
+
+
+def hash_password(password: str, n: int = 2**14, r: int = 8, p: int = 1) -> Hashed:
+    """
+    Hashes a password with scrypt. Slow on purpose, run it off the event loop.
+    """
+    salt = os.urandom(16)
+    digest = hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=64)
+    return Hashed(
+        f"{Hashed.PREFIX}{n}${r}${p}$"
+        f"{urlsafe_b64encode(salt).decode()}${urlsafe_b64encode(digest).decode()}"
+    )
+
+
+def verify_password(password: str, stored: str) -> bool:
+    """
+    Checks a password against a hash_password() hash. Slow on purpose, run it off the event loop.
+    """
+    try:
+        _, n, r, p, salt, digest = stored.split("$")
+        expected = urlsafe_b64decode(digest)
+        actual = hashlib.scrypt(
+            password.encode(),
+            salt=urlsafe_b64decode(salt),
+            n=int(n),
+            r=int(r),
+            p=int(p),
+            dklen=len(expected),
+        )
+    except (ValueError, TypeError):
+        return False
+    return hmac.compare_digest(actual, expected)
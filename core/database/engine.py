@@ -0,0 +1,100 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from os import getenv
+from dotenv import load_dotenv
+from typing import Dict, List
+
+load_dotenv()
+profile = {
+    "journal_mode": getenv("DB_JOURNAL_MODE", "WAL"),
+    "synchronous": getenv("DB_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(getenv("DB_MMAP_SIZE", 256 * 1024 * 1024)),
+    "cache_size": int(getenv("DB_CACHE_SIZE", -64 * 1024)),  # negative = KiB
+    "busy_timeout": int(getenv("DB_BUSY_TIMEOUT", 5000)),
+    "temp_store": getenv("DB_TEMP_STORE", "MEMORY"),
+}
+read_pool_size = int(getenv("DB_READ_POOL_SIZE", 8))
+write_queue_timeout = float(getenv("DB_WRITE_QUEUE_TIMEOUT", 60))
+
+
+def parse_routes(value: str) -> Dict[str, str]:
+    """
+    Parses DB_ROUTES, e.g. "audit_logs=audit,sessions=sessions", into {table: database}.
+    """
+    routes = {}
+    for route in value.split(","):
+        if "=" in route:
+            table, database = route.split("=", 1)
+            routes[table.strip()] = database.strip()
+    return routes
+
+
+routes = parse_routes(getenv("DB_ROUTES", ""))
+
+
+def database_path(name: str) -> str:
+    return (
+        getenv("DB_FOLDER_PATH")
+        + (f"{name}_" if name != "main" else "")
+        + "server.sqlite"
+    )
+
+
+def database_url(name: str) -> str:
+    return "sqlite+aiosqlite:///" + database_path(name)
+
+
+def apply_profile(
+    engine: AsyncEngine, read_only: bool = False, attach: List[str] = ()
+) -> AsyncEngine:
+    """
+    Runs the profile's PRAGMAs on every new connection of the engine and attaches
+    the other databases, so queries can join tables living in separate files.
+    """
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in profile.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        for name in attach:
+            cursor.execute(f"ATTACH DATABASE ? AS {name}_db", (database_path(name),))
+        if read_only:
+            cursor.execute("PRAGMA query_only=1")
+        cursor.close()
+
+    return engine
+
+
+def create_writer(name: str, attach: List[str] = ()) -> AsyncEngine:
+    """
+    Creates the engine all writes of a database go through.
+
+    It holds a single connection: concurrent writers wait in the pool's FIFO queue
+    instead of fighting over SQLite's write lock and failing with "database is locked".
+    """
+    return apply_profile(
+        create_async_engine(
+            database_url(name),
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=write_queue_timeout,
+        ),
+        attach=attach,
+    )
+
+
+def create_reader(name: str, attach: List[str] = ()) -> AsyncEngine:
+    """
+    Creates a pool of read-only connections. With WAL, reads don't block on the writer.
+    """
+    return apply_profile(
+        create_async_engine(
+            database_url(name),
+            pool_size=read_pool_size,
+            max_overflow=0,
+            pool_timeout=write_queue_timeout,
+        ),
+        read_only=True,
+        attach=attach,
+    )
@@ -0,0 +1,156 @@
+from array import array
+from asyncio import sleep
+from datetime import datetime
+from loguru import logger
+from typing import Dict, Tuple
+
+
+class RingBuffer:
+    """
+    Fixed-memory buffer of the last `capacity` samples.
+
+    Alongside each sample it keeps the running total, so the average of any of
+    the last n < capacity samples is a single subtraction.
+    """
+
+    def __init__(self, capacity: int = 100_000):
+        self.capacity = capacity
+        self.values = array("d", bytes(8 * capacity))
+        self.totals = array("d", bytes(8 * capacity))
+        self.count = 0
+        self.total = 0.0
+
+    def append(self, value: float) -> None:
+        index = self.count % self.capacity
+        self.total += value
+        self.values[index] = value
+        self.totals[index] = self.total
+        self.count += 1
+
+    def average(self, last: int = None) -> float:
+        """
+        Average of the last `last` samples (capped to capacity - 1), or of all samples.
+        """
+        if not self.count:
+            return 0.0
+        if last is None or last >= self.count:
+            return self.total / self.count
+        last = min(last, self.capacity - 1)
+        before = self.totals[(self.count - 1 - last) % self.capacity]
+        return (self.total - before) / last
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+
+class Histogram:
+    """
+    HDR-style log-linear histogram of durations in microseconds.
+
+    Buckets are exact below 2**PRECISION and keep PRECISION significant bits above
+    (~3% relative error), so recording is O(1) and percentiles scan a fixed number
+    of buckets regardless of how many samples were recorded.
+    """
+
+    PRECISION = 5
+    HALF = 1 << (PRECISION - 1)
+    MAX_SHIFT = 40
+
+    def __init__(self):
+        self.counts = array("q", bytes(8 * (self.MAX_SHIFT + 2) * self.HALF))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @classmethod
+    def _index(cls, micros: int) -> int:
+        if micros < 1 << cls.PRECISION:
+            return micros
+        shift = min(micros.bit_length() - cls.PRECISION, cls.MAX_SHIFT)
+        return shift * cls.HALF + min(micros >> shift, 2 * cls.HALF - 1)
+
+    @classmethod
+    def _value(cls, index: int) -> int:
+        if index < 1 << cls.PRECISION:
+            return index
+        shift = index // cls.HALF - 1
+        return ((index - shift * cls.HALF + 1) << shift) - 1
+
+    def record(self, seconds: float) -> None:
+        self.counts[self._index(max(int(seconds * 1_000_000), 0))] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, percent: float) -> float:
+        """
+        Returns the upper bound (in seconds) of the bucket holding the percentile.
+        """
+        if not self.count:
+            return 0.0
+        rank = max(int(self.count * percent / 100 + 0.5), 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self._value(index) / 1_000_000, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 5) if self.count else 0,
+            "p50_ms": round(self.percentile(50) * 1000, 5),
+            "p95_ms": round(self.percentile(95) * 1000, 5),
+            "p99_ms": round(self.percentile(99) * 1000, 5),
+            "max_ms": round(self.max * 1000, 5),
+        }
+
+
+class PerfomanceMeter:
+    """
+    Database delay meter: a ring buffer of the latest delays for windowed averages,
+    plus a histogram for every operation type and model.
+    """
+
+    def __init__(self, capacity: int = 100_000):
+        self.start = datetime.now()
+        self.recent = RingBuffer(capacity)
+        self.overall = Histogram()
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+
+    def record(self, operation: str, model: str, seconds: float) -> None:
+        self.recent.append(seconds)
+        self.overall.record(seconds)
+        histogram = self.histograms.get((operation, model))
+        if histogram is None:
+            histogram = self.histograms[(operation, model)] = Histogram()
+        histogram.record(seconds)
+
+    def delays(self, windows=(1, 10, 100, 1000, 10000)) -> dict:
+        delays = {"all_time": self.recent.average()}
+        for window in windows:
+            delays[f"last_{window}"] = self.recent.average(window)
+        return {
+            name: {"ms": round(value * 1000, 5), "s": round(value, 5)}
+            for name, value in delays.items()
+        }
+
+    def operations(self) -> dict:
+        result = {}
+        for (operation, model), histogram in sorted(self.histograms.items()):
+            result.setdefault(operation, {})[model] = histogram.summary()
+        return result
+
+    async def report(self, interval: float = 60 * 5) -> None:
+        while True:
+            await sleep(interval)
+            summary = self.overall.summary()
+            logger.info(
+                f"Database delay report:\n"
+                f"  - Average time per action: {self.recent.average() * 1000:.2f}ms\n"
+                f"  - Average time per action (last 1k): {self.recent.average(1000) * 1000:.2f}ms\n"
+                f"  - Average time per action (last 100): {self.recent.average(100) * 1000:.2f}ms\n"
+                f"  - p50/p95/p99/max: {summary['p50_ms']:.2f}/{summary['p95_ms']:.2f}/"
+                f"{summary['p99_ms']:.2f}/{summary['max_ms']:.2f}ms"
+            )
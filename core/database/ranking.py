@@ -0,0 +1,121 @@
+import numpy as np
+from asyncio import to_thread
+from os import getenv
+from typing import Callable, Dict, List, Sequence
+
+PAD = np.uint32(0xFFFFFFFF)  # not a valid code point, never equals a query char
+OFFLOAD_THRESHOLD = int(getenv("RANKING_OFFLOAD_THRESHOLD", 20_000))
+
+
+def encode(values: Sequence[str]) -> tuple:
+    """
+    Packs strings into an (n, max_len) uint32 code point matrix padded with PAD.
+
+    Returns:
+        tuple: (codes, lengths)
+    """
+    lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+    width = max(int(lengths.max(initial=0)), 1)
+    codes = (
+        np.array(values, dtype=f"<U{width}").view(np.uint32).reshape(len(values), width)
+    )
+    codes[np.arange(width) >= lengths[:, None]] = PAD
+    return codes, lengths
+
+
+def positional(values: Sequence[str], query: str) -> np.ndarray:
+    """
+    Share of positions holding the same character, over the longer string.
+    Batch equivalent of BaseItem.similarity.
+    """
+    codes, lengths = encode(values)
+    width = min(codes.shape[1], len(query))
+    q = np.frombuffer(query[:width].encode("utf-32-le"), dtype=np.uint32)
+    matches = (codes[:, :width] == q).sum(axis=1)
+    longest = np.maximum(lengths, len(query))
+    return np.divide(matches, longest, out=np.zeros(len(values)), where=longest > 0)
+
+
+def prefix(values: Sequence[str], query: str) -> np.ndarray:
+    """
+    Length of the common prefix, over the longer string.
+    """
+    codes, lengths = encode(values)
+    width = min(codes.shape[1], len(query))
+    q = np.frombuffer(query[:width].encode("utf-32-le"), dtype=np.uint32)
+    common = np.cumprod(codes[:, :width] == q, axis=1).sum(axis=1)
+    longest = np.maximum(lengths, len(query))
+    return np.divide(common, longest, out=np.zeros(len(values)), where=longest > 0)
+
+
+def trigram(values: Sequence[str], query: str) -> np.ndarray:
+    """
+    Jaccard similarity of the (case-insensitive) trigram sets.
+    """
+
+    def grams(value: str) -> set:
+        value = f"  {value.lower()} "
+        return {value[i : i + 3] for i in range(len(value) - 2)}
+
+    q = grams(query)
+    return np.fromiter(
+        (len(q & (g := grams(v))) / len(q | g) for v in values),
+        dtype=np.float64,
+        count=len(values),
+    )
+
+
+scorers: Dict[str, Callable[[Sequence[str], str], np.ndarray]] = {
+    "positional": positional,
+    "prefix": prefix,
+    "trigram": trigram,
+}
+
+
+def register_scorer(name: str, scorer: Callable[[Sequence[str], str], np.ndarray]):
+    """
+    Registers a scorer: a function taking a list of n strings and a query and
+    returning n float scores.
+    """
+    scorers[name] = scorer
+
+
+def score(values: Sequence, query, scorer: str = "positional") -> np.ndarray:
+    """
+    Scores every value against the query in one call.
+    """
+    if not len(values):
+        return np.zeros(0)
+    return scorers[scorer]([str(v) for v in values], str(query))
+
+
+def rank(items: List, keys: List[str], query, scorer: str = "positional") -> List:
+    """
+    Sorts items by their best score over `keys`, highest first.
+
+    Ties keep their input order, like sorted(..., reverse=True).
+    """
+    if not items or not keys:
+        return list(items)
+    best = np.max(
+        [score([getattr(item, key) for item in items], query, scorer) for key in keys],
+        axis=0,
+    )
+    return [items[i] for i in np.argsort(-best, kind="stable")]
+
+
+async def arank(
+    items: List, keys: List[str], query, scorer: str = "positional"
+) -> List:
+    """
+    rank(), moved to a worker thread for batches over RANKING_OFFLOAD_THRESHOLD values.
+    """
+    if len(items) * len(keys) > OFFLOAD_THRESHOLD:
+        return await to_thread(rank, items, keys, query, scorer)
+    return rank(items, keys, query, scorer)
+
+
+async def ascore(values: Sequence, query, scorer: str = "positional") -> np.ndarray:
+    if len(values) > OFFLOAD_THRESHOLD:
+        return await to_thread(score, values, query, scorer)
+    return score(values, query, scorer)
@@ -0,0 +1,88 @@
+from typing import Any, Dict, Iterable, Sequence
+from .crypto import ciphers, Hashed
+
+
+class EncryptedColumn:
+    """
+    Row attribute of a CRYPT_VALUES column: decrypted on first access only,
+    the stored value stays available through Row.raw().
+    """
+
+    __slots__ = ("raw", "cache")
+
+    def __init__(self, name: str):
+        self.raw = f"_raw_{name}"
+        self.cache = f"_plain_{name}"
+
+    def __get__(self, row, owner=None) -> Any:
+        if row is None:
+            return self
+        try:
+            return getattr(row, self.cache)
+        except AttributeError:
+            pass
+        value = getattr(row, self.raw)
+        if value is not None and not Hashed.matches_format(value):
+            value = ciphers.decrypt(value)
+        object.__setattr__(row, self.cache, value)
+        return value
+
+
+class Row:
+    """
+    Compact read-only result of BaseItem.select_columns(): only the selected
+    columns, in __slots__, without identity map or session state.
+    """
+
+    __slots__ = ()
+    __columns__: Sequence[str] = ()
+    __encrypted__: frozenset = frozenset()
+
+    def __init__(self, values: Iterable[Any]):
+        for name, value in zip(self.__columns__, values):
+            object.__setattr__(
+                self, f"_raw_{name}" if name in self.__encrypted__ else name, value
+            )
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is read-only")
+
+    def raw(self, name: str) -> Any:
+        """
+        Returns the column as stored, without decrypting it.
+        """
+        if name in self.__encrypted__:
+            return getattr(self, f"_raw_{name}")
+        return getattr(self, name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__columns__}
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={self.raw(name)!r}" for name in self.__columns__)
+        return f"<{self.__class__.__name__} {values}>"
+
+
+def make_row_class(name: str, columns: Sequence[str], encrypted: Iterable[str]) -> type:
+    """
+    Builds a Row subclass with a slot per column; encrypted columns get a raw
+    and a decrypted slot behind an EncryptedColumn.
+    """
+    encrypted = frozenset(encrypted) & frozenset(columns)
+    slots, namespace = [], {}
+    for column in columns:
+        if column in encrypted:
+            slots += [f"_raw_{column}", f"_plain_{column}"]
+            namespace[column] = EncryptedColumn(column)
+        else:
+            slots.append(column)
+    return type(
+        name,
+        (Row,),
+        {
+            "__slots__": tuple(slots),
+            "__columns__": tuple(columns),
+            "__encrypted__": encrypted,
+            **namespace,
+        },
+    )
@@ -0,0 +1,141 @@
+from sqlalchemy import text, literal_column, select, table, column, tuple_
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from typing import List
+
+
+class FullTextIndex:
+    """
+    SQLite FTS5 index over the searchable columns of a model.
+
+    The index is an external-content table (`<table>_fts`) using the trigram
+    tokenizer, so it answers the same case-insensitive substring queries as
+    ILIKE '%q%'. Triggers keep it in sync with every INSERT/UPDATE/DELETE on
+    the model's table, including bulk writes.
+    """
+
+    MIN_QUERY_LENGTH = 3  # trigram tokenizer can't match shorter strings
+
+    def __init__(self, model, columns: List[str]):
+        self.model = model
+        self.table = model.__tablename__
+        self.name = f"{self.table}_fts"
+        self.columns = columns
+
+    def ddl(self) -> List[str]:
+        cols = ", ".join(self.columns)
+        new = ", ".join(f"new.{c}" for c in self.columns)
+        old = ", ".join(f"old.{c}" for c in self.columns)
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.name} USING fts5("
+            f"{cols}, content='{self.table}', content_rowid='id', tokenize='trigram')",
+            f"CREATE TRIGGER IF NOT EXISTS {self.name}_ai AFTER INSERT ON {self.table} BEGIN "
+            f"INSERT INTO {self.name}(rowid, {cols}) VALUES (new.id, {new}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.name}_ad AFTER DELETE ON {self.table} BEGIN "
+            f"INSERT INTO {self.name}({self.name}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.name}_au AFTER UPDATE OF {cols} ON {self.table} BEGIN "
+            f"INSERT INTO {self.name}({self.name}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+            f"INSERT INTO {self.name}(rowid, {cols}) VALUES (new.id, {new}); END",
+        ]
+
+    async def create(self, conn: AsyncConnection) -> bool:
+        """
+        Creates the index and its triggers if missing. A freshly created index
+        is filled from the existing rows.
+
+        Returns:
+            bool: True if the index didn't exist before
+        """
+        exists = (
+            await conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"),
+                {"name": self.name},
+            )
+        ).first()
+        for statement in self.ddl():
+            await conn.execute(text(statement))
+        if not exists:
+            await self.rebuild(conn)
+        return not exists
+
+    async def rebuild(self, conn: AsyncConnection) -> None:
+        await conn.execute(
+            text(f"INSERT INTO {self.name}({self.name}) VALUES ('rebuild')")
+        )
+
+    def supports(self, query: str, keys: List[str]) -> bool:
+        return (
+            bool(keys)
+            and len(query) >= self.MIN_QUERY_LENGTH
+            and set(keys) <= set(self.columns)
+        )
+
+    def match_expression(self, query: str, keys: List[str]) -> str:
+        phrase = '"' + query.replace('"', '""') + '"'
+        return "{" + " ".join(keys) + "} : " + phrase
+
+    async def search(
+        self,
+        session: AsyncSession,
+        query: str,
+        keys: List[str],
+        limit: int = -1,
+        offset: int = 0,
+        **filters,
+    ) -> list:
+        """
+        Runs one ranked (bm25) query against the index, with filters and
+        limit/offset applied in SQL.
+        """
+        model = self.model
+        fts = table(self.name, column("rowid"), column("rank"))
+        stmt = (
+            select(model)
+            .join(fts, fts.c.rowid == model.id)
+            .where(
+                literal_column(self.name).op("MATCH")(
+                    self.match_expression(query, keys)
+                )
+            )
+            .where(*[getattr(model, k) == v for k, v in filters.items()])
+            .order_by(fts.c.rank, model.id)
+            .limit(None if limit == -1 else limit)
+            .offset(offset)
+        )
+        return (await session.execute(stmt)).scalars().all()
+
+    async def search_after(
+        self,
+        session: AsyncSession,
+        query: str,
+        keys: List[str],
+        limit: int = 100,
+        after: list = None,
+        **filters,
+    ) -> List[tuple]:
+        """
+        Keyset variant of search(): returns up to `limit` (item, rank) pairs ranked
+        after the (rank, id) pair `after`.
+        """
+        model = self.model
+        fts = table(self.name, column("rowid"), column("rank"))
+        stmt = (
+            select(model, fts.c.rank)
+            .join(fts, fts.c.rowid == model.id)
+            .where(
+                literal_column(self.name).op("MATCH")(
+                    self.match_expression(query, keys)
+                )
+            )
+            .where(*[getattr(model, k) == v for k, v in filters.items()])
+        )
+        if after:
+            stmt = stmt.where(tuple_(fts.c.rank, model.id) > tuple_(*after))
+        stmt = stmt.order_by(fts.c.rank, model.id).limit(limit)
+        return (await session.execute(stmt)).all()
+
+
+if __name__ == "__main__":
+    from asyncio import run
+    from core.database import rebuild_search_indexes
+
+    run(rebuild_search_indexes())
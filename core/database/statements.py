@@ -0,0 +1,168 @@
+import re
+from collections import deque
+from os import getenv
+from datetime import datetime
+from time import perf_counter
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from typing import Dict, List
+
+STRINGS = re.compile(r"'(?:[^']|'')*'")
+NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+LISTS = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+ROWS = re.compile(r"(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+")
+SPACES = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """
+    Normalizes a statement so every execution of the same query shape shares
+    one fingerprint: literals become ?, lists and multi-row VALUES collapse.
+    """
+    statement = STRINGS.sub("?", statement)
+    statement = NUMBERS.sub("?", statement)
+    statement = LISTS.sub("(...)", statement)
+    statement = ROWS.sub(r"\1", statement)
+    return SPACES.sub(" ", statement).strip()
+
+
+class StatementStats:
+    """
+    `affected` is the cursor rowcount, which SQLite only reports for writes:
+    rows inserted, updated or deleted, not rows a SELECT returned.
+    """
+
+    __slots__ = ("count", "total", "max", "affected")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.affected = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 5),
+            "avg_ms": round(self.total / self.count * 1000, 5) if self.count else 0,
+            "max_ms": round(self.max * 1000, 5),
+            "rows_affected": self.affected,
+        }
+
+
+class StatementProfiler:
+    """
+    Per-statement latency, affected row counts and fingerprints collected from
+    engine events.
+
+    Statements slower than `slow_threshold` seconds go to a bounded slow-query log
+    together with their EXPLAIN QUERY PLAN.
+    """
+
+    def __init__(self, slow_threshold: float = 0.05, slow_log_size: int = 100):
+        self.slow_threshold = slow_threshold
+        self.stats: Dict[str, StatementStats] = {}
+        self.slow = deque(maxlen=slow_log_size)
+
+    def attach(self, engine: AsyncEngine, database: str) -> None:
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def before_cursor_execute(
+            conn, cursor, statement, parameters, context, executemany
+        ):
+            conn.info.setdefault("statement_start", []).append(perf_counter())
+
+        @event.listens_for(engine.sync_engine, "handle_error")
+        def handle_error(context):
+            # a failed statement never reaches after_cursor_execute
+            starts = (
+                context.connection.info.get("statement_start")
+                if context.connection
+                else None
+            )
+            if starts:
+                starts.pop()
+
+        @event.listens_for(engine.sync_engine, "after_cursor_execute")
+        def after_cursor_execute(
+            conn, cursor, statement, parameters, context, executemany
+        ):
+            elapsed = perf_counter() - conn.info["statement_start"].pop()
+            self.record(
+                conn,
+                database,
+                statement,
+                parameters,
+                elapsed,
+                cursor.rowcount,
+                executemany,
+            )
+
+    def record(
+        self,
+        conn,
+        database: str,
+        statement: str,
+        parameters,
+        elapsed: float,
+        rowcount: int,
+        executemany: bool = False,
+    ) -> None:
+        key = fingerprint(statement)
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = StatementStats()
+        stats.count += 1
+        stats.total += elapsed
+        stats.max = max(stats.max, elapsed)
+        if rowcount and rowcount > 0:
+            stats.affected += rowcount
+        if elapsed < self.slow_threshold:
+            return
+        entry = {
+            "at": str(datetime.now()),
+            "database": database,
+            "ms": round(elapsed * 1000, 5),
+            "rows_affected": rowcount if rowcount >= 0 else None,
+            "fingerprint": key,
+            "plan": (
+                None if executemany else self.explain(conn, statement, parameters)
+            ),
+        }
+        self.slow.append(entry)
+        logger.warning(f"Slow query ({entry['ms']}ms): {key} {entry['plan']}")
+
+    @staticmethod
+    def explain(conn, statement: str, parameters) -> List[str] | None:
+        if (
+            not statement.lstrip()
+            .upper()
+            .startswith(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"))
+        ):
+            return None
+        try:
+            cursor = conn.connection.cursor()
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters or ())
+            plan = [row[3] for row in cursor.fetchall()]
+            cursor.close()
+            return plan
+        except Exception as exc:
+            return [f"Unavailable: {exc}"]
+
+    def top(self, limit: int = 20, by: str = "total") -> List[dict]:
+        ranked = sorted(
+            self.stats.items(), key=lambda item: getattr(item[1], by), reverse=True
+        )
+        return [
+            {"fingerprint": key, **stats.to_dict()} for key, stats in ranked[:limit]
+        ]
+
+    def reset(self) -> None:
+        self.stats.clear()
+        self.slow.clear()
+
+
+profiler = StatementProfiler(
+    slow_threshold=float(getenv("SLOW_QUERY_MS", 50)) / 1000,
+    slow_log_size=int(getenv("SLOW_QUERY_LOG_SIZE", 100)),
+)
@@ -44,12 +44,8 @@ class Methods:
 
             if account.username and len(account.username) < 3:
                 errors.append(request.state.tl("USERNAME_TOO_SHORT"))
-            if account.username and await User.get(username=account.username):
-                errors.append(request.state.tl("USERNAME_TAKEN"))
             if account.username is None and account.email is None:
                 errors.append(request.state.tl("EMAIL_OR_USERNAME_REQUIRED"))
-            if account.email and await User.get(email=account.email):
-                errors.append(request.state.tl("EMAIL_TAKEN"))
             if account.email and not match(r"[^@]+@[^@]+\.[^@]+", account.email):
                 errors.append(request.state.tl("INVALID_EMAIL"))
             if len(account.password) < 8:
@@ -62,63 +58,85 @@ class Methods:
             if not any(char.isdigit() for char in account.password):
                 errors.append(request.state.tl("PASSWORD_TOO_WEAK_NUMBERS"))
 
-            for user in await User.get_all(reg_ip=request.state.ip):
-                if user.created_at.timestamp() + 60 * 60 > datetime.now().timestamp():
-                    errors.append(request.state.tl("TOO_MANY_REGISTRATIONS"))
+            async def conflicts() -> list:
+                found = []
+                if account.username and await User.is_taken(
+                    "username", account.username
+                ):
+                    found.append(request.state.tl("USERNAME_TAKEN"))
+                if account.email and await User.is_taken("email", account.email):
+                    found.append(request.state.tl("EMAIL_TAKEN"))
+                for user in await User.select_columns(
+                    "created_at", reg_ip=request.state.ip
+                ):
+                    if user.created_at.timestamp() + 60 * 60 > datetime.now().timestamp():
+                        found.append(request.state.tl("TOO_MANY_REGISTRATIONS"))
+                return found
+
+            # cheap checks first, so rejected registrations never pay for the hash
+            if not errors:
+                errors.extend(await conflicts())
+            # hashed before the transaction so it doesn't hold the writer connection
+            password = (
+                await app.credentials.hash(account.password) if not errors else None
+            )
+
+            try:
+                async with User.transaction():
+                    if not errors:
+                        # another registration may have won the race during the hash
+                        errors.extend(await conflicts())
+                    if len(errors) == 0:
+                        email_confirm_code = (
+                            User._generate_secret(64) if account.email else None
+                        )
+                        user = await User.add(
+                            username=account.username,
+                            email=account.email,
+                            password=password,
+                            reg_ip=request.state.ip,
+                            reg_type=reg_type,
+                            email_confirm_code=email_confirm_code,
+                        )
+                        session = await user.create_session(
+                            ip=request.state.ip,
+                            user_agent=request.headers.get("user-agent", None),
+                            country=request.headers.get("cf-ipcountry", None),
+                            region=request.headers.get("cf-region", None),
+                            city=request.headers.get("cf-city", None),
+                            platform=request.headers.get("sec-ch-ua-platform", None),
+                        )
+            except Exception as e:
+                app.logger.error(e)
+                return
 
             if len(errors) == 0:
-                try:
-                    email_confirm_code = (
-                        User._generate_secret(64) if account.email else None
-                    )
+                app.logdebug(f"User created: {user}")
+                if account.email:
                     email_confirm_url = f"{app.api_url or request.base_url}account/auth/confirmEmail?key={email_confirm_code}"
-                    user = await User.add(
-                        username=account.username,
-                        email=account.email,
-                        password=account.password,
-                        reg_ip=request.state.ip,
-                        reg_type=reg_type,
-                        email_confirm_code=email_confirm_code,
-                    )
-                    app.debug(f"User created: {user}")
-                    if account.email:
-                        app.email.send(
-                            to=account.email,
-                            subject=request.state.tl("CONFIRM_REGISTRATION_SUBJECT"),
-                            message_content=request.state.tl(
-                                "CONFIRM_REGISTRATION_BODY"
-                            ).format(
-                                user=user.username,
-                                key_url=email_confirm_url,
-                                ip=request.state.ip,
-                            ),
+                    await app.email.send(
+                        to=account.email,
+                        subject=request.state.tl("CONFIRM_REGISTRATION_SUBJECT"),
+                        message_content=request.state.tl(
+                            "CONFIRM_REGISTRATION_BODY"
+                        ).format(
                             user=user.username,
                             key_url=email_confirm_url,
                             ip=request.state.ip,
-                        )
-                    return JSONResponse(
-                        {
-                            "details": request.state.tl("ACCOUNT_CREATED"),
-                            "user_id": user.id,
-                            "token": (
-                                await user.create_session(
-                                    ip=request.state.ip,
-                                    user_agent=request.headers.get("user-agent", None),
-                                    country=request.headers.get("cf-ipcountry", None),
-                                    region=request.headers.get("cf-region", None),
-                                    city=request.headers.get("cf-city", None),
-                                    platform=request.headers.get(
-                                        "sec-ch-ua-platform", None
-                                    ),
-                                )
-                            ).token,
-                        },
-                        status_code=201,
-                        headers=app.no_cache_headers,
+                        ),
+                        user=user.username,
+                        key_url=email_confirm_url,
+                        ip=request.state.ip,
                     )
-                except Exception as e:
-                    app.logger.error(e)
-                    return
+                return JSONResponse(
+                    {
+                        "details": request.state.tl("ACCOUNT_CREATED"),
+                        "user_id": user.id,
+                        "token": session.token,
+                    },
+                    status_code=201,
+                    headers=app.no_cache_headers,
+                )
             return JSONResponse(
                 {"details": errors}, status_code=400, headers=app.no_cache_headers
             )
@@ -133,7 +151,7 @@ class Methods:
         ) -> JSONResponse:
             user = await User.get(email_confirm_code=key)
             if user:
-                app.debug(f"User confirmed: {user}")
+                app.logdebug(f"User confirmed: {user}")
                 await user.update(
                     email_confirmed=True,
                     email_confirm_code=None,
@@ -162,7 +180,7 @@ class Methods:
                     status_code=400,
                     headers=app.no_cache_headers,
                 )
-            if password == (user.decrypted()).password:
+            if await app.credentials.verify(user, password):
                 for session in await user.get_sessions():
                     if not session.ip or len(session.ip.split(".")) != 4:
                         continue
@@ -11,10 +11,11 @@ from datetime import datetime
 from ..database import (
     User,
     perfomance,
+    profiler,
+    row_caches,
+    token_cache,
     choice,
     ascii_letters,
-    getenv,
-    load_dotenv,
     Session,
 )
 from ..other import track_usage
@@ -42,38 +43,22 @@ class Methods:
             setattr(request.state, "tl", lambda text: app.tl(text, language))
             ip = request.headers.get("cf-connecting-ip", request.client.host)
             setattr(request.state, "ip", ip)
-            app.ipratelimit.setdefault(ip, [])
-            load_dotenv()
-
-            app.ipratelimit[ip] = [
-                t
-                for t in app.ipratelimit[ip]
-                if time.time() - t <= int(getenv("IP_RATE_LIMIT_PERIOD_SECONDS", 60))
-            ]
-            app.ipratelimit[ip].append(time.time())
-
             user = await Session.get_user(
                 token=request.headers.get("X-Authorization", None)
             )
+            limit = app.ipratelimit.hit(
+                ip, enforce=bool(user and "admin" not in (user.groups or []))
+            )
 
             response = None
-            if (
-                len(app.ipratelimit[ip]) > int(getenv("IP_RATE_LIMIT_PER_PERIOD", 60))
-                or len([x for x in app.ipratelimit[ip] if x + 1 >= time.time()])
-                > int(getenv("IP_RATE_LIMIT_PER_SECOND", 3))
-            ) and (user and "admin" not in user.groups):
-                retry_after = max(
-                    1,
-                    int(getenv("IP_RATE_LIMIT_PERIOD_SECONDS", 60))
-                    - (time.time() - app.ipratelimit[ip][0]),
-                )
+            if not limit.allowed:
                 response = JSONResponse(
                     status_code=429,
                     content={"detail": request.state.tl("IP_RATE_LIMIT_EXCEEDED")},
                 )
             try:
                 if response:
-                    response.headers["Retry-After"] = str(retry_after)
+                    response.headers["Retry-After"] = str(limit.retry_after)
                 else:
                     response = await call_next(request)
             except Exception as exc:
@@ -86,10 +71,8 @@ class Methods:
             response.headers.update(
                 {
                     "X-Auth-As": f"{user.username}" if user else str(None),
-                    "X-Requests-Last-Minute": str(len(app.ipratelimit[ip])),
-                    "X-Requests-Last-Second": str(
-                        len([x for x in app.ipratelimit[ip] if x + 1 >= time.time()])
-                    ),
+                    "X-Requests-Last-Minute": str(limit.counts["period"]),
+                    "X-Requests-Last-Second": str(limit.counts["second"]),
                     "X-Process-Time": str(time.perf_counter() - start_time),
                     "X-Process-Time-MS": str((time.perf_counter() - start_time) * 1000),
                     "X-Server-Time": str(datetime.now()),
@@ -126,64 +109,48 @@ class Methods:
         async def database(
             request: Request, x_authorization: Annotated[str, Header()] = None
         ) -> JSONResponse:
-            await User.get_chunk(limit=500)
-            delays = {
-                "all_time": {
-                    "ms": round(sum(perfomance.all) / len(perfomance.all) * 1000, 5),
-                    "s": round(sum(perfomance.all) / len(perfomance.all), 5),
-                },
-                "last_1": {
-                    "ms": round(
-                        sum(perfomance.all[-1:]) / len(perfomance.all[-1:]) * 1000, 5
-                    ),
-                    "s": round(sum(perfomance.all[-1:]) / len(perfomance.all[-1:]), 5),
-                },
-                "last_10": {
-                    "ms": round(
-                        sum(perfomance.all[-10:]) / len(perfomance.all[-10:]) * 1000, 5
-                    ),
-                    "s": round(
-                        sum(perfomance.all[-10:]) / len(perfomance.all[-10:]), 5
-                    ),
-                },
-                "last_100": {
-                    "ms": round(
-                        sum(perfomance.all[-100:]) / len(perfomance.all[-100:]) * 1000,
-                        5,
-                    ),
-                    "s": round(
-                        sum(perfomance.all[-100:]) / len(perfomance.all[-100:]), 5
-                    ),
-                },
-                "last_1000": {
-                    "ms": round(
-                        sum(perfomance.all[-1000:])
-                        / len(perfomance.all[-1000:])
-                        * 1000,
-                        5,
-                    ),
-                    "s": round(
-                        sum(perfomance.all[-1000:]) / len(perfomance.all[-1000:]), 5
-                    ),
-                },
-                "last_10000": {
-                    "ms": round(
-                        sum(perfomance.all[-10000:])
-                        / len(perfomance.all[-10000:])
-                        * 1000,
-                        5,
-                    ),
-                    "s": round(
-                        sum(perfomance.all[-10000:]) / len(perfomance.all[-10000:]), 5
-                    ),
-                },
-            }
+            await User.select_columns("id", "username", limit=500)
+            delays = perfomance.delays()
 
             return JSONResponse(
                 {
                     "status": "ok" if delays["last_100"]["ms"] < 90 else "slow",
-                    "total_actions": len(perfomance.all),
+                    "total_actions": perfomance.recent.count,
                     "delays": delays,
+                    "percentiles": perfomance.overall.summary(),
+                    "operations": perfomance.operations(),
+                    "credentials": app.credentials.stats(),
+                    "email": await app.email.stats(),
+                    "http": app.http.get_stats(),
+                    "ip_state": {
+                        "ipratelimit": app.ipratelimit.stats(),
+                        "turnstile_buf": app.turnstile_buf.stats(),
+                    },
+                    "bloom": User.bloom_stats(),
+                    "token_cache": token_cache.stats(),
+                    "row_cache": {
+                        table: cache.stats() for table, cache in row_caches.items()
+                    },
+                },
+                headers=app.no_cache_headers,
+            )
+
+        @app.get(
+            self.path + "database/queries",
+            dependencies=[Depends(app.checks.admin_check)],
+        )
+        @track_usage
+        async def database_queries(
+            request: Request,
+            limit: int = 20,
+            by: Literal["total", "count", "max", "affected"] = "total",
+        ) -> JSONResponse:
+            return JSONResponse(
+                {
+                    "status": "ok",
+                    "statements": len(profiler.stats),
+                    "top": profiler.top(limit, by),
+                    "slow": list(profiler.slow),
                 },
                 headers=app.no_cache_headers,
             )
@@ -211,13 +178,15 @@ class Methods:
             request: Request, count: int = 5000, data: Literal["users"] = "users"
         ) -> JSONResponse:
             if data == "users":
-                for x in range(count):
-                    await User.add(
-                        username=f"stress_{x}"
+                await User.add_many(
+                    {
+                        "username": f"stress_{x}"
                         + "".join(choice(ascii_letters) for _ in range(6)),
-                        email=f"stress_{x}"
+                        "email": f"stress_{x}"
                         + "".join(choice(ascii_letters) for _ in range(6))
                         + "@example.com",
-                        password="".join(choice(ascii_letters) for _ in range(12)),
-                    )
+                        "password": "".join(choice(ascii_letters) for _ in range(12)),
+                    }
+                    for x in range(count)
+                )
             return JSONResponse({"status": "ok"}, headers=app.no_cache_headers)
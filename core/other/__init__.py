@@ -3,3 +3,7 @@ from .translator import Translator
 from .checks import Checks
 from .perfomance import track_usage
 from .email import Email
+from .credentials import Credentials
+from .expiring import ExpiringMap
+from .ratelimit import RateLimiter, RateLimitHit
+from .http import HTTPClients, clients as http_clients
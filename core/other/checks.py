@@ -1,7 +1,6 @@
 from fastapi import HTTPException, Header, Request
 from typing import Annotated
-from time import time
-from ..database import User, Session, getenv
+from ..database import User, Session
 from .turnstile import validate
 
 
@@ -65,11 +64,8 @@ class Checks:
     async def turnstile_check(
         self, request: Request, cf_turnstile_response: Annotated[str, Header()] = None
     ):
-        if self.app.turnstile_buf.get(request.state.ip) is not None:
-            if time() > self.app.turnstile_buf[request.state.ip]:
-                del self.app.turnstile_buf[request.state.ip]
-            else:
-                return True
+        if self.app.turnstile_buf.get(request.state.ip):
+            return True
         if cf_turnstile_response is None:
             raise HTTPException(
                 status_code=400, detail=request.state.tl("NO_TURNSTILE_RESPONSE")
@@ -79,7 +75,5 @@ class Checks:
             raise HTTPException(
                 status_code=400, detail=request.state.tl("INVALID_TURNSTILE_RESPONSE")
             )
-        self.app.turnstile_buf[request.state.ip] = time() + int(
-            getenv("TURNSTILE_ACCESS_BUF", 60 * 60)
-        )
+        self.app.turnstile_buf[request.state.ip] = True
         return True
@@ -0,0 +1,96 @@
+from asyncio import Semaphore, get_running_loop
+from concurrent.futures import ThreadPoolExecutor
+from cryptography.fernet import InvalidToken
+from os import getenv
+from time import perf_counter
+from loguru import logger
+from ..database import User, Hashed, hash_password, verify_password
+
+
+class Credentials:
+    """
+    Password hashing and verification, run in a bounded thread pool so slow KDF
+    calls never block the event loop.
+
+    At most `max_concurrency` calls run at once, the rest wait in a queue whose
+    depth is reported by stats().
+    """
+
+    def __init__(self, workers: int = None, max_concurrency: int = None):
+        workers = workers or int(getenv("CREDENTIALS_WORKERS", 4))
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="credentials"
+        )
+        self.semaphore = Semaphore(
+            max_concurrency or int(getenv("CREDENTIALS_MAX_CONCURRENCY", workers))
+        )
+        self.waiting = 0
+        self.running = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.upgraded = 0
+        self.total_time = 0.0
+
+    async def _run(self, func, *args):
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        start_at = perf_counter()
+        try:
+            return await get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.semaphore.release()
+            self.running -= 1
+            self.completed += 1
+            self.total_time += perf_counter() - start_at
+
+    async def hash(self, password: str) -> Hashed:
+        """
+        Hashes a password for storage.
+        """
+        return await self._run(hash_password, password)
+
+    async def verify(self, user: User, password: str) -> bool:
+        """
+        Checks a password against the one stored for the user.
+
+        Passwords still stored with the legacy reversible column encryption are
+        re-stored as a hash after the first successful check.
+        """
+        stored = user.password
+        if not stored:
+            return False
+        if Hashed.matches_format(stored):
+            return await self._run(verify_password, password, stored)
+        try:
+            valid = await self._run(User._compare, password, stored)
+        except InvalidToken:
+            return False
+        if valid:
+            try:
+                await User.update(id=user.id, password=await self.hash(password))
+                self.upgraded += 1
+            except Exception as exc:
+                logger.error(f"Error while upgrading password hash of {user}: {exc}")
+        return valid
+
+    def stats(self) -> dict:
+        return {
+            "waiting": self.waiting,
+            "running": self.running,
+            "max_waiting": self.max_waiting,
+            "completed": self.completed,
+            "upgraded": self.upgraded,
+            "avg_ms": (
+                round(self.total_time / self.completed * 1000, 5)
+                if self.completed
+                else 0
+            ),
+        }
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
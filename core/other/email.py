@@ -1,40 +1,248 @@
 import smtplib
+from email.message import EmailMessage
+from asyncio import Event, create_task, get_running_loop, wait_for, sleep
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from os import getenv, path, listdir
+from time import monotonic
+from typing import List
+from loguru import logger
+from ..database import EmailOutbox
+
+
+class SMTPConnection:
+    """
+    A warm SMTP connection owned by one outbox worker. Opened lazily, checked
+    with NOOP after being idle and reopened once when the server drops it.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 30, idle: float = 60):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.idle = idle
+        self.smtp: smtplib.SMTP | None = None
+        self.used_at = 0.0
+        self.connects = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.smtp is not None and monotonic() - self.used_at > self.idle:
+            try:
+                self.smtp.noop()
+            except (smtplib.SMTPException, OSError):
+                self.close()
+        if self.smtp is None:
+            self.smtp = smtplib.SMTP(
+                self.host, self.port, local_hostname="localhost", timeout=self.timeout
+            )
+            self.connects += 1
+        return self.smtp
+
+    @staticmethod
+    def _build(message: EmailOutbox) -> EmailMessage:
+        email = EmailMessage()
+        email["From"] = message.from_addr
+        email["To"] = message.to_addr
+        email["Subject"] = message.subject
+        email.set_content(message.body, charset="utf-8")
+        return email
+
+    def send_batch(self, messages: List[EmailOutbox]) -> List[Exception | None]:
+        """
+        Sends the messages over this connection (blocking, run it in a thread).
+
+        A message that cannot be built or sent only fails itself, the rest of the
+        batch still goes out.
+
+        Returns:
+            List[Exception | None]: the error of every message, None when it was sent
+        """
+        results = []
+        for message in messages:
+            for attempt in range(2):
+                try:
+                    self._connect().send_message(self._build(message))
+                    self.used_at = monotonic()
+                    results.append(None)
+                    break
+                except (smtplib.SMTPServerDisconnected, ConnectionError) as exc:
+                    self.close()
+                    if attempt:
+                        results.append(exc)
+                except smtplib.SMTPException as exc:
+                    results.append(exc)
+                    break
+                except OSError as exc:
+                    self.close()
+                    results.append(exc)
+                    break
+                except Exception as exc:
+                    results.append(exc)
+                    break
+        return results
+
+    def close(self) -> None:
+        if self.smtp is None:
+            return
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self.smtp.close()
+        self.smtp = None
 
 
 class Email:
-    smtp = smtplib.SMTP(
-        getenv("SMTP_HOST", "localhost"),
-        int(getenv("SMTP_PORT", 25)),
-        local_hostname="localhost",
-    )
+    """
+    Sends emails through the EmailOutbox table: send() only queues the message,
+    `workers` background tasks each keep a warm SMTP connection, claim due rows
+    in batches and retry failures with exponential backoff.
+    """
 
     def __init__(self, from_addr, app):
         self.from_addr = from_addr
         self.app = app
+        self.workers = int(getenv("EMAIL_WORKERS", 2))
+        self.batch_size = int(getenv("EMAIL_BATCH_SIZE", 20))
+        self.max_attempts = int(getenv("EMAIL_MAX_ATTEMPTS", 5))
+        self.backoff = float(getenv("EMAIL_RETRY_BACKOFF", 30))
+        self.poll_interval = float(getenv("EMAIL_POLL_INTERVAL", 5))
+        self.connections = [
+            SMTPConnection(
+                getenv("SMTP_HOST", "localhost"), int(getenv("SMTP_PORT", 25))
+            )
+            for _ in range(self.workers)
+        ]
+        self.executor = None
+        self.tasks = []
+        self.wakeup = Event()
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.presets = self._load_presets()
 
-    def send(
+    @staticmethod
+    def _load_presets() -> dict:
+        folder = path.join(path.dirname(__file__), "email_presets")
+        presets = {}
+        if not path.isdir(folder):
+            return presets
+        for filename in listdir(folder):
+            if filename.endswith(".txt") or filename.endswith(".html"):
+                with open(path.join(folder, filename), "r") as f:
+                    presets[".".join(filename.split(".")[:-1])] = f.read()
+        return presets
+
+    async def send(
         self,
         to: str,
         message_content: str,
         subject: str,
         from_addr: str = None,
         **format,
-    ) -> None:
+    ) -> EmailOutbox:
         if message_content in self.presets.keys():
             message_content = str(self.presets[message_content]).format(**format)
         elif self.app.tl(message_content) != message_content:
             message_content = (self.app.tl(message_content)).format(**format)
-        self.app.debug(
-            f'Sending email with subject "{subject}" to {to}; message: {message_content[:50]}...'
+        self.app.logdebug(
+            f'Queueing email with subject "{subject}" to {to}; message: {message_content[:50]}...'
         )
-        self.smtp.sendmail(
-            from_addr or self.from_addr, to, f"Subject: {subject}\n\n{message_content}"
+        message = await EmailOutbox.add(
+            to_addr=to,
+            from_addr=from_addr or self.from_addr,
+            subject=subject,
+            body=message_content,
+            next_attempt_at=datetime.now(),
+        )
+        self.wakeup.set()
+        return message
+
+    async def start(self) -> None:
+        """
+        Requeues emails interrupted by the previous shutdown and starts the workers.
+        """
+        recovered = await EmailOutbox.recover()
+        if recovered:
+            logger.info(f"Requeued {recovered} interrupted emails")
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="smtp"
         )
+        self.tasks = [
+            create_task(self._work(connection)) for connection in self.connections
+        ]
+
+    async def _work(self, connection: SMTPConnection) -> None:
+        while True:
+            try:
+                self.wakeup.clear()
+                messages = await EmailOutbox.claim(self.batch_size)
+                if not messages:
+                    try:
+                        await wait_for(self.wakeup.wait(), self.poll_interval)
+                    except TimeoutError:
+                        pass
+                    continue
+                results = await get_running_loop().run_in_executor(
+                    self.executor, connection.send_batch, messages
+                )
+                await self._finish(messages, results)
+            except Exception as exc:
+                logger.error(f"Email worker error: {exc}")
+                await sleep(self.poll_interval)
+
+    async def _finish(
+        self, messages: List[EmailOutbox], results: List[Exception | None]
+    ) -> None:
+        sent, retry, failed = [], {}, {}
+        for message, error in zip(messages, results):
+            if error is None:
+                sent.append(message.id)
+                continue
+            permanent = (
+                (
+                    isinstance(error, smtplib.SMTPResponseException)
+                    and error.smtp_code >= 500
+                )
+                or isinstance(error, smtplib.SMTPRecipientsRefused)
+                # not a delivery problem: the message itself cannot be built
+                or not isinstance(error, (smtplib.SMTPException, OSError))
+            )
+            if permanent or message.attempts >= self.max_attempts:
+                failed[message.id] = repr(error)
+                logger.warning(
+                    f"Email {message.id} to {message.to_addr} failed: {error}"
+                )
+            else:
+                retry[message.id] = (
+                    repr(error),
+                    datetime.now()
+                    + timedelta(seconds=self.backoff * 2 ** (message.attempts - 1)),
+                )
+        await EmailOutbox.finish(sent, retry, failed)
+        self.sent += len(sent)
+        self.retried += len(retry)
+        self.failed += len(failed)
+
+    async def stats(self) -> dict:
+        return {
+            "workers": len(self.tasks),
+            "depth": await EmailOutbox.depth(),
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "connections": sum(
+                connection.smtp is not None for connection in self.connections
+            ),
+            "connects": sum(connection.connects for connection in self.connections),
+        }
 
-    presets = {}
-    for filename in listdir(path.join(path.dirname(__file__) + "/email_presets/")):
-        if filename.endswith(".txt") or filename.endswith(".html"):
-            presets[".".join(filename.split(".")[:-1])] = open(
-                path.join(path.dirname(__file__) + "/email_presets", filename), "r"
-            ).read()
+    async def shutdown(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        self.tasks = []
+        if self.executor is not None:
+            for connection in self.connections:
+                await get_running_loop().run_in_executor(
+                    self.executor, connection.close
+                )
+            self.executor.shutdown(wait=False)
@@ -1,9 +1,34 @@
-from ..database import User, create_tables, AuditLog
+from ..database import (
+    User,
+    create_tables,
+    build_bloom_filters,
+    AuditLog,
+    audit_compact_interval,
+    ciphers,
+    rotate_encryption,
+    blacklists,
+    perfomance,
+)
+from os import getenv
+from asyncio import create_task
 
 
 async def setup_hook(app, *args, **kwargs) -> None:
     app.logdebug("Creating tables...")
     await create_tables()
+    await build_bloom_filters()
+    if audit_compact_interval:
+        app.audit_compactor = create_task(AuditLog.compact_forever())
+    app.perfomance_reporter = create_task(
+        perfomance.report(float(getenv("PERFOMANCE_REPORT_INTERVAL", 60 * 5)))
+    )
+    app.blacklist_watcher = create_task(
+        blacklists.watch(float(getenv("BLACKLIST_RELOAD_INTERVAL", 30)))
+    )
+    await app.email.start()
+    if len(ciphers.keys) > 1:
+        app.logdebug("Rotating encrypted values to the primary crypt key...")
+        app.crypt_rotation = create_task(rotate_encryption())
     try:
         user = await User.get(username="dev")
         if not user:
@@ -0,0 +1,142 @@
+from collections import OrderedDict
+from heapq import heappush, heappop, heapify
+from itertools import count
+from time import monotonic
+from typing import Any, Hashable
+
+
+class ExpiringMap:
+    """
+    Dict with a TTL per entry and a hard capacity, for per-IP / per-token state
+    that hostile traffic must not be able to grow without bound.
+
+    get/set are O(1). Expired entries are swept from a heap of expiry times a few
+    at a time on every write (stale heap items are skipped lazily), and once full
+    the least recently used entry is evicted: reads count as use, so a flood of new
+    keys pushes out idle ones before busy ones.
+
+    With `evict=False` live entries are never dropped: once every slot holds one,
+    set() refuses new keys and returns False, so the caller can fail closed.
+    """
+
+    SWEEP_PER_WRITE = 4
+
+    def __init__(self, capacity: int = 100_000, ttl: float = 60.0, evict: bool = True):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.evict = evict
+        self._data: OrderedDict[Hashable, tuple] = OrderedDict()
+        self._heap: list = []
+        self._counter = count()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.refused = 0
+
+    def set(self, key: Hashable, value: Any, ttl: float = None) -> bool:
+        """
+        Stores the value for `ttl` seconds (the map's ttl if None).
+
+        Returns:
+            bool: False if the map is full of live entries and doesn't evict
+        """
+        if (
+            not self.evict
+            and key not in self._data
+            and len(self._data) >= self.capacity
+        ):
+            self.sweep()
+            if len(self._data) >= self.capacity:
+                self.refused += 1
+                return False
+        expires_at = monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        heappush(self._heap, (expires_at, next(self._counter), key))
+        self.sweep(self.SWEEP_PER_WRITE)
+        while len(self._data) > self.capacity:
+            self._data.popitem(last=False)
+            self.evicted += 1
+        if len(self._heap) > 2 * len(self._data) + 64:
+            self._compact()
+        return True
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        if entry[0] <= monotonic():
+            del self._data[key]
+            self.expired += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None or entry[0] <= monotonic() else entry[1]
+
+    def setdefault(self, key: Hashable, default: Any = None) -> Any:
+        value = self.get(key, self)
+        if value is self:
+            self.set(key, default)
+            return default
+        return value
+
+    def sweep(self, limit: int = None) -> int:
+        """
+        Drops up to `limit` expired entries (all of them if None).
+        """
+        now, swept = monotonic(), 0
+        heap, data = self._heap, self._data
+        while heap and heap[0][0] <= now and (limit is None or swept < limit):
+            expires_at, _, key = heappop(heap)
+            entry = data.get(key)
+            if entry is not None and entry[0] == expires_at:
+                del data[key]
+                self.expired += 1
+                swept += 1
+        return swept
+
+    def _compact(self) -> None:
+        self._heap = [
+            (expires_at, next(self._counter), key)
+            for key, (expires_at, _) in self._data.items()
+        ]
+        heapify(self._heap)
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self.get(key, self)
+        if value is self:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        if not self.set(key, value):
+            raise OverflowError(f"{self.__class__.__name__} is full")
+
+    def __delitem__(self, key: Hashable) -> None:
+        del self._data[key]
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, self) is not self
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "capacity": self.capacity,
+            "ttl": self.ttl,
+            "heap": len(self._heap),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "refused": self.refused,
+        }
@@ -0,0 +1,157 @@
+import aiohttp
+from asyncio import TimeoutError
+from contextlib import asynccontextmanager
+from os import getenv
+from time import perf_counter
+from typing import AsyncIterator, Dict
+from yarl import URL
+from ..database.metrics import Histogram
+
+
+class HostStats:
+    __slots__ = ("requests", "errors", "statuses", "connections", "reused", "latency")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.statuses: Dict[int, int] = {}
+        self.connections = 0
+        self.reused = 0
+        self.latency = Histogram()
+
+    def to_dict(self) -> dict:
+        total = self.connections + self.reused
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "statuses": self.statuses,
+            "connections_opened": self.connections,
+            "connections_reused": self.reused,
+            "reuse_rate": round(self.reused / total, 5) if total else 0.0,
+            "latency": self.latency.summary(),
+        }
+
+
+class HTTPClients:
+    """
+    App-lifetime outbound HTTP clients: one aiohttp session per host, each with its
+    own keep-alive connection pool, so repeated calls skip DNS, TCP and TLS setup.
+
+    Sessions are created on first use (on the running loop) and closed by close()
+    on shutdown. Connection reuse and latency are tracked per host.
+    """
+
+    def __init__(
+        self,
+        limit_per_host: int = None,
+        keepalive: float = None,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+    ):
+        self.limit_per_host = limit_per_host or int(getenv("HTTP_POOL_SIZE", 10))
+        self.keepalive = keepalive or float(getenv("HTTP_KEEPALIVE", 30))
+        self.connect_timeout = connect_timeout or float(
+            getenv("HTTP_CONNECT_TIMEOUT", 5)
+        )
+        self.read_timeout = read_timeout or float(getenv("HTTP_READ_TIMEOUT", 10))
+        self.sessions: Dict[str, aiohttp.ClientSession] = {}
+        self.stats: Dict[str, HostStats] = {}
+
+    def _trace(self, stats: HostStats) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_connection_create_end(session, context, params):
+            stats.connections += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            stats.reused += 1
+
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace
+
+    def session(self, url: str) -> aiohttp.ClientSession:
+        """
+        Returns the pooled session of the url's host, creating it on first use.
+        """
+        origin = str(URL(url).origin())
+        session = self.sessions.get(origin)
+        if session is None or session.closed:
+            stats = self.stats.setdefault(origin, HostStats())
+            session = self.sessions[origin] = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.limit_per_host,
+                    keepalive_timeout=self.keepalive,
+                    ttl_dns_cache=300,
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=self.connect_timeout, sock_read=self.read_timeout
+                ),
+                trace_configs=[self._trace(stats)],
+            )
+        return session
+
+    @asynccontextmanager
+    async def request(
+        self,
+        method: str,
+        url: str,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+        **kwargs,
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """
+        Sends a request through the host's pool.
+
+        Latency is measured until the response headers arrive. Errors count failed
+        connections, timeouts, broken bodies and 4xx/5xx responses, not exceptions
+        raised by the caller's own code inside the block.
+
+        Usage:
+            async with clients.request("POST", url, data={...}) as resp:
+                data = await resp.json()
+
+        Args:
+            method (str): the HTTP method
+            url (str): the url
+            connect_timeout (float, optional): overrides HTTP_CONNECT_TIMEOUT for this call
+            read_timeout (float, optional): overrides HTTP_READ_TIMEOUT for this call
+            **kwargs: passed to aiohttp's request (data, json, headers, ...)
+        """
+        session = self.session(url)
+        stats = self.stats[str(URL(url).origin())]
+        if connect_timeout or read_timeout:
+            kwargs["timeout"] = aiohttp.ClientTimeout(
+                sock_connect=connect_timeout or self.connect_timeout,
+                sock_read=read_timeout or self.read_timeout,
+            )
+        start_at = perf_counter()
+        stats.requests += 1
+        try:
+            resp = await session.request(method, url, **kwargs)
+        except (aiohttp.ClientError, TimeoutError):
+            stats.errors += 1
+            raise
+        finally:
+            stats.latency.record(perf_counter() - start_at)
+        stats.statuses[resp.status] = stats.statuses.get(resp.status, 0) + 1
+        if resp.status >= 400:
+            stats.errors += 1
+        try:
+            yield resp
+        except (aiohttp.ClientError, TimeoutError):
+            stats.errors += 1
+            raise
+        finally:
+            resp.release()
+
+    def get_stats(self) -> Dict[str, dict]:
+        return {origin: stats.to_dict() for origin, stats in self.stats.items()}
+
+    async def close(self) -> None:
+        for session in self.sessions.values():
+            await session.close()
+        self.sessions.clear()
+
+
+clients = HTTPClients()
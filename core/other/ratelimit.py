@@ -0,0 +1,114 @@
+from math import ceil
+from time import time
+from typing import Dict, Hashable, Tuple
+from .expiring import ExpiringMap
+
+
+class RateLimitHit:
+    __slots__ = ("allowed", "counts", "retry_after")
+
+    def __init__(self, allowed: bool, counts: Dict[str, int], retry_after: int):
+        self.allowed = allowed
+        self.counts = counts
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Sliding-window counter rate limiter checking several windows at once.
+
+    Every key keeps, per window, the index of its current fixed bucket plus the
+    count of the current and previous bucket; the rate over the last window is
+    estimated as `current + previous * (share of the previous bucket still inside
+    the window)`. That is O(1) time and a few integers per key whatever the traffic.
+
+    Keys live in an ExpiringMap whose TTL is two of the longest windows: the entry
+    is refreshed only when that window's bucket rolls over, and by the time it
+    expires all its counts would be zero anyway, so idle keys are dropped for free.
+    Live keys are never evicted, or a flood of new keys would reset the counters of
+    a limited one; when `capacity` keys are live, new keys are refused (fail closed).
+
+    Usage:
+        limiter = RateLimiter({"period": (60, 60), "second": (3, 1)})
+        hit = limiter.hit(ip)  # hit.allowed, hit.counts["second"], hit.retry_after
+        hit = limiter.hit(ip, enforce=False)  # counted, but always allowed
+    """
+
+    def __init__(self, windows: Dict[str, Tuple[int, float]], capacity: int = 100_000):
+        """
+        Args:
+            windows (Dict[str, Tuple[int, float]]): name -> (limit, window seconds)
+            capacity (int): max tracked live keys, new keys over it are limited
+        """
+        self.windows = [
+            (name, limit, float(seconds)) for name, (limit, seconds) in windows.items()
+        ]
+        self.longest = max(range(len(self.windows)), key=lambda i: self.windows[i][2])
+        self.state = ExpiringMap(
+            capacity=capacity, ttl=2 * self.windows[self.longest][2], evict=False
+        )
+        self.requests = 0
+        self.over_limit = 0
+        self.limited = 0
+
+    def hit(
+        self, key: Hashable, enforce: bool = True, now: float = None
+    ) -> RateLimitHit:
+        """
+        Counts a request of `key` and checks it against every window.
+
+        Args:
+            key (Hashable): who is limited, e.g. the client ip
+            enforce (bool, optional): whether going over a limit rejects the request,
+                False only counts it (e.g. for admins). Defaults to True.
+
+        Returns:
+            RateLimitHit: whether the request is allowed, the estimated requests per
+                window (this one included) and, when limited, the seconds until
+                the exceeded windows roll over
+        """
+        now = time() if now is None else now
+        state = self.state.get(key)
+        refresh = state is None
+        if refresh:
+            state = [0] * (3 * len(self.windows))
+        over, counts, retry_after = False, {}, 0
+        for i, (name, limit, seconds) in enumerate(self.windows):
+            at = 3 * i
+            bucket = int(now // seconds)
+            if bucket != state[at]:
+                if i == self.longest:
+                    refresh = True
+                state[at + 2] = state[at + 1] if bucket == state[at] + 1 else 0
+                state[at + 1] = 0
+                state[at] = bucket
+            state[at + 1] += 1
+            elapsed = now / seconds - bucket
+            count = int(state[at + 1] + state[at + 2] * (1 - elapsed))
+            counts[name] = count
+            if count > limit:
+                over = True
+                retry_after = max(retry_after, ceil((1 - elapsed) * seconds))
+        if refresh and not self.state.set(key, state):
+            # every slot holds a live key: can't track this one, so fail closed
+            over = True
+            retry_after = max(retry_after, ceil(self.windows[self.longest][2]))
+        self.requests += 1
+        if over:
+            self.over_limit += 1
+        allowed = not (over and enforce)
+        if not allowed:
+            self.limited += 1
+        return RateLimitHit(allowed, counts, 0 if allowed else max(1, retry_after))
+
+    def stats(self) -> dict:
+        return {
+            "windows": {
+                name: {"limit": limit, "seconds": seconds}
+                for name, limit, seconds in self.windows
+            },
+            "requests": self.requests,
+            "over_limit": self.over_limit,
+            "limited": self.limited,
+            "keys": self.state.stats(),
+        }
@@ -1,10 +1,10 @@
 # ref: https://gist.github.com/mikeckennedy/97ea085358e7ee663e1afa430fe0d979
 
 
-import aiohttp
 import os
 import pydantic
 from typing import Optional
+from .http import clients
 
 
 cloudflare_secret_key = os.getenv("CF_SECRET_KEY", None)
@@ -43,24 +43,23 @@ async def validate(
         secret=cloudflare_secret_key, response=turnstile_response, remoteip=user_ip
     )
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.post(url, data=model.model_dump()) as resp:
-                if resp.status != 200:
-                    model = SiteVerifyResponse(success=False, hostname=None)
-                    model.error_codes.extend(
-                        [
-                            f"Failure status code: {resp.status}",
-                            f"Failure details: {await resp.text()}",
-                        ]
-                    )
-                    return model
+    try:
+        async with clients.request("POST", url, data=model.model_dump()) as resp:
+            if resp.status != 200:
+                model = SiteVerifyResponse(success=False, hostname=None)
+                model.error_codes.extend(
+                    [
+                        f"Failure status code: {resp.status}",
+                        f"Failure details: {await resp.text()}",
+                    ]
+                )
+                return model
 
-                site_response = SiteVerifyResponse(**await resp.json())
-                return site_response
-        except Exception as x:
-            model = SiteVerifyResponse(success=False, hostname=None)
-            model.error_codes.extend(
-                ["Failure status code: Unknown", f"Failure details: {x}"]
-            )
-            return model
+            site_response = SiteVerifyResponse(**await resp.json())
+            return site_response
+    except Exception as x:
+        model = SiteVerifyResponse(success=False, hostname=None)
+        model.error_codes.extend(
+            ["Failure status code: Unknown", f"Failure details: {x}"]
+        )
+        return model